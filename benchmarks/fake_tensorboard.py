@@ -0,0 +1,98 @@
+"""
+Stand-in for TensorBoard's scalars endpoint, as queried by the runner's
+TensorBoard metric source. Scalars are read from the tfevents files in the
+results directory with the runner's own event file reader.
+
+    python benchmarks/fake_tensorboard.py [--logdir=results] [--port=6006] [--latency=0]
+
+--latency adds a delay in seconds to every response, for simulating a busy server.
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import Any, List, Tuple
+import urllib.parse
+
+from util import load_runner_module
+
+
+class FakeTensorBoard():
+    """
+    :param str logdir: results directory
+    :param int port: server port
+    :param float latency: delay in seconds added to every response
+    """
+
+    def __init__(self, logdir: str, port: int = 6006, latency: float = 0):
+        self.source: Any = load_runner_module().EventFileSource(logdir)
+        self.latency: float = latency
+        self.num_requests: int = 0
+        tb: FakeTensorBoard = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                tb.num_requests += 1
+                url: urllib.parse.ParseResult = urllib.parse.urlparse(self.path)
+                query: dict = urllib.parse.parse_qs(url.query)
+                if tb.latency > 0:
+                    time.sleep(tb.latency)
+                if url.path != '/data/plugin/scalars/scalars' or 'run' not in query or 'tag' not in query:
+                    self.send_error(404)
+                    return
+                data: List[Tuple[int, float]] = tb.source.get_scalars(query['run'][0], query['tag'][0])
+                if not data:
+                    # TensorBoard responds with an error for unknown runs and tags
+                    self.send_error(400, 'Invalid run or tag')
+                    return
+                body: bytes = json.dumps([[0.0, step, value] for step, value in data]).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer(('localhost', port), Handler)
+        self.server.daemon_threads = True
+
+    """
+    Serves requests in a background thread.
+
+    :rtype: None
+    """
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    """
+    Stops serving requests.
+
+    :rtype: None
+    """
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--logdir', default='results')
+    parser.add_argument('--port', type=int, default=6006)
+    parser.add_argument('--latency', type=float, default=0)
+    args: argparse.Namespace = parser.parse_args()
+    tb: FakeTensorBoard = FakeTensorBoard(args.logdir, args.port, args.latency)
+    print(f'Serving scalars from {args.logdir} at http://localhost:{args.port}/')
+    try:
+        tb.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
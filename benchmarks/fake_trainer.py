@@ -0,0 +1,173 @@
+"""
+Stand-in for mlagents-learn. Reads the run config, writes synthetic scalar
+summaries to results/<run-id>/<behavior>/events.out.tfevents.* every
+summary_freq steps until max_steps, and exits. Accepts all mlagents-learn
+arguments, but only uses the config path, --run-id, --results-dir and --resume.
+
+Behavior is controlled by environment variables:
+FAKE_STEP_TIME   seconds per summary period, defaults to 0.05
+FAKE_EXIT_CODE   exit code after training, defaults to 0
+FAKE_FAIL_RATE   probability (0 - 1) of exiting with code 1 instead, defaults to 0
+FAKE_CHECKPOINT_BYTES  size of a <behavior>-<step>.pt file saved on exit, none if 0 (default)
+FAKE_SAVE_TIME   seconds an interrupted trainer spends saving its checkpoint, defaults to 0
+
+The cumulative reward approaches a plateau that depends on a hash of the
+behavior's hyperparameters, so runs with different values can be ranked.
+An interrupt (SIGINT) saves the current step, a resumed run continues from it.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import socket
+import struct
+import sys
+import time
+from typing import Any, Dict, List
+
+import yaml
+
+CRC_TABLE: List[int] = []
+for i in range(256):
+    crc: int = i
+    for _ in range(8):
+        crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+    CRC_TABLE.append(crc)
+
+
+"""
+Computes the masked CRC32C checksum used by TFRecords.
+
+:param bytes data: data
+:return: masked checksum
+:rtype: int
+"""
+
+
+def masked_crc(data: bytes) -> int:
+    crc: int = 0xFFFFFFFF
+    for b in data:
+        crc = CRC_TABLE[(crc ^ b) & 0xFF] ^ (crc >> 8)
+    crc ^= 0xFFFFFFFF
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+def varint(n: int) -> bytes:
+    out: bytearray = bytearray()
+    while True:
+        b: int = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def field(number: int, wire_type: int, payload: bytes) -> bytes:
+    key: bytes = varint(number << 3 | wire_type)
+    if wire_type == 2:
+        return key + varint(len(payload)) + payload
+    return key + payload
+
+
+"""
+Serializes an Event message with a single simple_value summary.
+
+:param int step: step
+:param str tag: TensorBoard tag
+:param float value: scalar value
+:return: serialized Event
+:rtype: bytes
+"""
+
+
+def encode_event(step: int, tag: str, value: float) -> bytes:
+    summary_value: bytes = field(1, 2, tag.encode('utf-8')) + field(2, 5, struct.pack('<f', value))
+    return field(1, 1, struct.pack('<d', time.time())) + field(2, 0, varint(step)) + \
+        field(5, 2, field(1, 2, summary_value))
+
+
+"""
+Frames a serialized Event as a TFRecord.
+
+:param bytes data: serialized Event
+:return: record
+:rtype: bytes
+"""
+
+
+def encode_record(data: bytes) -> bytes:
+    header: bytes = struct.pack('<Q', len(data))
+    return header + struct.pack('<I', masked_crc(header)) + data + struct.pack('<I', masked_crc(data))
+
+
+def get_arg(args: List[str], name: str, default: str = None) -> str:
+    for arg in args:
+        if arg.startswith(name + '='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+def main():
+    args: List[str] = sys.argv[1:]
+    config_path: str = next(arg for arg in args if arg.endswith('.yaml'))
+    run_id: str = get_arg(args, '--run-id', 'ppo')
+    results_dir: str = get_arg(args, '--results-dir', 'results')
+    resume: bool = '--resume' in args
+    step_time: float = float(os.environ.get('FAKE_STEP_TIME', 0.05))
+    exit_code: int = int(os.environ.get('FAKE_EXIT_CODE', 0))
+    fail_rate: float = float(os.environ.get('FAKE_FAIL_RATE', 0))
+    checkpoint_bytes: int = int(os.environ.get('FAKE_CHECKPOINT_BYTES', 0))
+    save_time: float = float(os.environ.get('FAKE_SAVE_TIME', 0))
+
+    with open(config_path) as f:
+        config: Dict[str, Any] = yaml.safe_load(f)
+
+    behaviors: List[Dict[str, Any]] = []
+    for name, settings in config['behaviors'].items():
+        dir: str = os.path.join(results_dir, run_id, name)
+        os.makedirs(dir, exist_ok=True)
+        checkpoint: str = os.path.join(dir, 'checkpoint.json')
+        step: int = 0
+        if resume and os.path.isfile(checkpoint):
+            with open(checkpoint) as f:
+                step = json.load(f)['step']
+        digest: bytes = hashlib.sha1(json.dumps(settings.get('hyperparameters', {}), sort_keys=True,
+                                                default=str).encode('utf-8')).digest()
+        events: str = os.path.join(dir, f'events.out.tfevents.{int(time.time())}.{socket.gethostname()}.'
+                                        f'{os.getpid()}')
+        behaviors.append({'step': step, 'max_steps': int(settings.get('max_steps', 500000)),
+                          'summary_freq': int(settings.get('summary_freq', 50000)),
+                          'plateau': digest[0] / 255 * 100, 'events': events, 'checkpoint': checkpoint,
+                          'name': name})
+
+    try:
+        while any(b['step'] < b['max_steps'] for b in behaviors):
+            time.sleep(step_time)
+            for b in behaviors:
+                if b['step'] >= b['max_steps']:
+                    continue
+                b['step'] = min(b['step'] + b['summary_freq'], b['max_steps'])
+                progress: float = b['step'] / b['max_steps']
+                reward: float = b['plateau'] * (1 - math.exp(-4 * progress)) + random.gauss(0, 1)
+                with open(b['events'], 'ab') as f:
+                    f.write(encode_record(encode_event(b['step'], 'Environment/Cumulative Reward', reward)))
+                    f.write(encode_record(encode_event(b['step'], 'Environment/Episode Length',
+                                                       1000 * (1 - progress) + 10)))
+    except KeyboardInterrupt:
+        time.sleep(save_time)
+
+    for b in behaviors:
+        with open(b['checkpoint'], 'w') as f:
+            json.dump({'step': b['step']}, f)
+        if checkpoint_bytes > 0:
+            with open(os.path.join(os.path.dirname(b['checkpoint']), f'{b["name"]}-{b["step"]}.pt'), 'wb') as f:
+                f.write(os.urandom(checkpoint_bytes))
+    sys.exit(1 if random.random() < fail_rate else exit_code)
+
+
+if __name__ == '__main__':
+    main()
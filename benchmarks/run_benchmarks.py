@@ -0,0 +1,221 @@
+"""
+Benchmarks config expansion and complete sweeps without Unity or TensorBoard.
+
+    python benchmarks/run_benchmarks.py [--combos=10,1000,100000] [--slots=1,4,16,64]
+
+Expansion: for grids of each --combos size, measures parsing the config,
+generating and hashing run configs (for up to --samples runs, evenly spread
+over the grid), and peak memory allocated by Python while doing so.
+
+Sweeps: for each --slots count, runs a complete grid sweep of --runs-per-slot
+runs per slot with the fake trainer, and reports wall time, slot idle fraction
+and stop check latency. Runs with a low synthetic reward are stopped by a
+stop condition, if it is checked before they complete.
+Use --metric-source=tensorboard to query a fake TensorBoard server on port 6006.
+
+Launching trainers requires a POSIX system (the fake trainer is started
+through an executable mlagents-learn script on PATH).
+"""
+
+import argparse
+from contextlib import redirect_stdout
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import yaml
+
+from util import install_fake_trainer, load_runner_module
+
+m = load_runner_module()
+
+
+"""
+Splits a combo count into value list lengths of at most 10 where possible.
+
+:param int combos: number of combinations
+:return: value list lengths, their product is combos
+:rtype: List[int]
+"""
+
+
+def get_dims(combos: int) -> List[int]:
+    dims: List[int] = []
+    while combos > 1:
+        size: int = next((d for d in range(10, 1, -1) if combos % d == 0), combos)
+        dims.append(size)
+        combos //= size
+    return dims or [1]
+
+
+"""
+Writes a trainer config with opt_values lists.
+
+:param str path: config path
+:param List[int] dims: value list lengths
+:param Dict[str, Any] extra: additional behavior settings
+:rtype: None
+"""
+
+
+def write_config(path: str, dims: List[int], extra: Dict[str, Any] = None) -> None:
+    hyperparameters: Dict[str, Any] = {'batch_size': 64, 'buffer_size': 12000}
+    for i, size in enumerate(dims):
+        hyperparameters[f'param_{i}'] = {'opt_values': [round(0.001 * (v + 1), 6) for v in range(size)]}
+    behavior: Dict[str, Any] = {'trainer_type': 'ppo', 'hyperparameters': hyperparameters,
+                                'network_settings': {'hidden_units': 128, 'num_layers': 2},
+                                'max_steps': 10000, 'summary_freq': 1000}
+    behavior.update(extra or {})
+    with open(path, 'w') as f:
+        yaml.dump({'behaviors': {'Bench': behavior}}, f)
+
+
+"""
+Parses runner arguments from a list, like the runner does from sys.argv.
+
+:param List[str] argv: arguments without the script name
+:return: ArgParser instance
+:rtype: ArgParser
+"""
+
+
+def parse_args(argv: List[str]) -> Any:
+    sys.argv = ['mlagents-learn.py'] + argv
+    return m.ArgParser()
+
+
+"""
+Measures config parsing and run config generation for a grid.
+
+:param str dir: working directory
+:param int combos: grid size
+:param int samples: max. number of run configs to generate
+:return: results
+:rtype: Dict[str, Any]
+"""
+
+
+def bench_expansion(dir: str, combos: int, samples: int) -> Dict[str, Any]:
+    path: str = os.path.join(dir, f'grid_{combos}.yaml')
+    write_config(path, get_dims(combos))
+    args: Any = parse_args([path, '--run-cache=off'])
+
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    with redirect_stdout(open(os.devnull, 'w')):
+        config: Any = m.Config(args)
+    parse_time: float = time.perf_counter() - start
+
+    count: int = min(samples, config.num_runs)
+    step: float = config.num_runs / count
+    start = time.perf_counter()
+    for i in range(count):
+        run_config: Dict[str, Any] = config.get_run_config(int(i * step))
+        config.get_config_hash(run_config)
+    generate_time: float = time.perf_counter() - start
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'combos': config.num_runs, 'parse_ms': round(parse_time * 1000, 2),
+            'run_config_us': round(generate_time / count * 1e6, 1),
+            'peak_mem_kb': round(peak / 1024, 1)}
+
+
+"""
+Runs a complete sweep with the fake trainer.
+
+:param str dir: working directory
+:param int slots: number of slots
+:param int runs: number of runs
+:param str metric_source: 'events' or 'tensorboard'
+:return: results
+:rtype: Dict[str, Any]
+"""
+
+
+def bench_sweep(dir: str, slots: int, runs: int, metric_source: str) -> Dict[str, Any]:
+    sweep_dir: str = os.path.join(dir, f'sweep_{slots}')
+    os.makedirs(sweep_dir)
+    path: str = os.path.join(sweep_dir, 'sweep.yaml')
+    # Stops runs whose synthetic reward plateau is below ~35
+    write_config(path, get_dims(runs), {'opt_stop': {'tag': 'Environment/Cumulative Reward',
+                                                     'step': 5000, 'min': 30}})
+    results_dir: str = os.path.join(sweep_dir, 'results')
+    args: Any = parse_args([path, f'--num-envs={slots}', '--check-interval=1', f'--metric-source={metric_source}',
+                            f'--results-dir={results_dir}', '--run-cache=off', '--backend=headless'])
+
+    tb: Any = None
+    if metric_source == 'tensorboard':
+        from fake_tensorboard import FakeTensorBoard
+        tb = FakeTensorBoard(results_dir)
+        tb.start()
+    try:
+        start: float = time.perf_counter()
+        with redirect_stdout(open(os.devnull, 'w')):
+            runner: Any = m.Runner(args)
+        wall_time: float = time.perf_counter() - start
+    finally:
+        if tb:
+            tb.stop()
+
+    stats: Any = runner.stats
+    idle, busy = stats.get_slot_times()
+    return {'slots': slots, 'runs': runs, 'wall_s': round(wall_time, 2),
+            'runs_per_min': round(runs / wall_time * 60, 1),
+            'idle_fraction': round(idle / (idle + busy), 3) if idle + busy > 0 else None,
+            'stopped': stats.runs.get('stopped', 0),
+            'check_ms_mean': round(stats.check_time / stats.checks * 1000, 2) if stats.checks else None,
+            'check_ms_max': round(stats.check_max * 1000, 2)}
+
+
+def print_table(title: str, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    keys: List[str] = list(rows[0].keys())
+    widths: List[int] = [max(len(k), *(len(str(r[k])) for r in rows)) for k in keys]
+    print(f'\n{title}')
+    print('  '.join(k.rjust(w) for k, w in zip(keys, widths)))
+    for r in rows:
+        print('  '.join(str(r[k]).rjust(w) for k, w in zip(keys, widths)))
+
+
+def main():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--combos', default='10,100,1000,10000,100000', help='grid sizes for expansion')
+    parser.add_argument('--samples', type=int, default=1000, help='max. run configs generated per grid')
+    parser.add_argument('--slots', default='1,4,16,64', help='slot counts for sweeps, empty to skip')
+    parser.add_argument('--runs-per-slot', type=int, default=4)
+    parser.add_argument('--step-time', type=float, default=0.05, help='fake trainer seconds per summary')
+    parser.add_argument('--metric-source', default='events', choices=['events', 'tensorboard'])
+    parser.add_argument('--json', help='also write results to this file')
+    args: argparse.Namespace = parser.parse_args()
+
+    dir: str = tempfile.mkdtemp(prefix='mlagents-bench-')
+    results: Dict[str, List[Dict[str, Any]]] = {'expansion': [], 'sweeps': []}
+    try:
+        for combos in [int(c) for c in args.combos.split(',') if c]:
+            results['expansion'].append(bench_expansion(dir, combos, args.samples))
+        print_table('Config expansion', results['expansion'])
+
+        slot_counts: List[int] = [int(s) for s in args.slots.split(',') if s]
+        if slot_counts:
+            install_fake_trainer(dir)
+            os.environ['FAKE_STEP_TIME'] = str(args.step_time)
+            for slots in slot_counts:
+                results['sweeps'].append(bench_sweep(dir, slots, slots * args.runs_per_slot, args.metric_source))
+            print_table(f'Sweeps ({args.metric_source})', results['sweeps'])
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
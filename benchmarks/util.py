@@ -0,0 +1,50 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import importlib.util
+import os
+import stat
+import sys
+from types import ModuleType
+
+BENCHMARK_DIR: str = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR: str = os.path.dirname(BENCHMARK_DIR)
+
+
+"""
+Loads mlagents-learn.py as a module, its file name isn't a valid module name.
+
+:return: the module
+:rtype: ModuleType
+"""
+
+
+def load_runner_module() -> ModuleType:
+    name: str = 'mlagents_hyperparams'
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, 'mlagents-learn.py'))
+    module: ModuleType = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+"""
+Creates an mlagents-learn executable that runs the fake trainer, and
+prepends its directory to PATH, so the runner launches the fake trainer.
+
+:param str dir: directory for the executable
+:rtype: None
+"""
+
+
+def install_fake_trainer(dir: str) -> None:
+    path: str = os.path.join(dir, 'mlagents-learn')
+    with open(path, 'w') as f:
+        f.write(f'#!{sys.executable}\n'
+                f'import runpy\n'
+                f'runpy.run_path({os.path.join(BENCHMARK_DIR, "fake_trainer.py")!r}, run_name="__main__")\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ['PATH'] = dir + os.pathsep + os.environ.get('PATH', '')
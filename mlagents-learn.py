@@ -1,13 +1,33 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+import bisect
+import csv
+import glob
+import gzip
+import hashlib
+import heapq
 import json
+import logging
+import logging.handlers
+import math
 import os
 import platform
+import queue
+import random
 import requests
+import shutil
+import signal
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
 import time
-from typing import Any, Dict, List, Union
+from typing import Any, Deque, Dict, Iterator, List, Set, Tuple, Union
 import urllib.parse
+import xmlrpc.client
+from xmlrpc.server import SimpleXMLRPCServer
 import yaml
 
 """
@@ -22,9 +42,25 @@ class ArgParser():
         args: List[str] = sys.argv
         del args[0]
 
-        value: Any = self.get_value(args, '.yaml')
+        # Worker of a distributed sweep: controller address host:port
+        value: Any = self.get_value(args, '--worker=')
+        self.worker: str = str(value) if value else None
+
+        # Controller of a distributed sweep: port for serving jobs to workers
+        value = self.get_value(args, '--serve=')
+        self.serve: int = int(value) if value else 0
+
+        # Aggregate the event files of a sweep instead of training
+        self.summarize: bool = 'summarize' in args
+        if self.summarize:
+            args.remove('summarize')
+
+        value = self.get_value(args, '.yaml')
         if value:
             self.config_path: str = str(value)
+        elif self.worker:
+            # Workers receive their run configs from the controller
+            self.config_path: str = None
         else:
             raise ValueError('No config yaml path specified.')
 
@@ -37,6 +73,144 @@ class ArgParser():
         value = self.get_value(args, 'base-port')
         self.base_port: int = int(value) if value else 5005
 
+        value = self.get_value(args, 'check-interval')
+        self.check_interval: int = int(value) if value else 60
+
+        # Pin each slot to its own set of CPUs (Linux only)
+        self.pin_cpus: bool = self.get_value(args, 'pin-cpus') is not None
+
+        # Max. CPU utilization (0 - 1) for starting new runs
+        value = self.get_value(args, 'max-load')
+        self.max_load: float = float(value) if value else 0
+
+        # Min. available memory in MB for starting new runs
+        value = self.get_value(args, 'min-free-mem')
+        self.min_free_mem: int = int(value) if value else 0
+
+        # Min. seconds between run starts if max-load or min-free-mem are set,
+        # gives new trainers time to allocate their resources
+        value = self.get_value(args, 'admit-delay')
+        self.admit_delay: int = int(value) if value else 10
+
+        # How to launch trainers: 'terminal' opens a console window for each run,
+        # 'headless' runs them in the background and writes their output to log files
+        value = self.get_value(args, 'backend')
+        self.backend: str = str(value) if value else ('terminal' if platform.system() == 'Windows' else 'headless')
+
+        # Directory for headless trainer log files, defaults to logs/ next to the config
+        value = self.get_value(args, 'log-dir')
+        self.log_dir: str = str(value) if value else os.path.join(os.path.dirname(self.config_path or ''), 'logs')
+
+        # Max. size of a trainer log file before it is rotated
+        value = self.get_value(args, 'log-max-bytes')
+        self.log_max_bytes: int = int(value) if value else 10 * 1024 * 1024
+
+        # Max. number of concurrent metric queries
+        value = self.get_value(args, 'check-workers')
+        self.check_workers: int = int(value) if value else 8
+
+        # How to schedule runs: 'grid', 'hyperband', 'tpe' or 'pbt'
+        value = self.get_value(args, 'scheduler')
+        self.scheduler: str = str(value) if value else 'grid'
+
+        # Tag for ranking runs
+        value = self.get_value(args, 'rank-tag')
+        self.rank_tag: str = str(value) if value else 'Environment/Cumulative Reward'
+
+        # Step budget of the first hyperband rung
+        value = self.get_value(args, 'min-steps')
+        self.min_steps: int = int(value) if value else 0
+
+        # Hyperband reduction factor
+        value = self.get_value(args, '--eta')
+        self.eta: int = int(value) if value else 3
+
+        # Number of TPE runs with random sample points
+        value = self.get_value(args, 'tpe-startup')
+        self.tpe_startup: int = int(value) if value else 10
+
+        # Number of concurrently trained PBT members, defaults to num_envs
+        value = self.get_value(args, 'population')
+        self.population: int = int(value) if value else self.num_envs
+
+        # Steps each PBT member trains between exploit/explore steps
+        value = self.get_value(args, 'pbt-interval')
+        self.pbt_interval: int = int(value) if value else 0
+
+        # Tag for ranking runs whose checkpoints are kept, defaults to rank-tag
+        # Must be parsed before 'keep-top'
+        value = self.get_value(args, 'keep-top-tag')
+        self.keep_top_tag: str = str(value) if value else None
+
+        # Number of top runs whose checkpoints are kept, all are kept if 0
+        value = self.get_value(args, 'keep-top')
+        self.keep_top: int = int(value) if value else 0
+
+        # Compress the headless trainer logs of finished runs
+        self.compress_logs: bool = self.get_value(args, 'compress-logs') is not None
+
+        # Order of new runs: 'grid', 'interleaved', 'spread', 'priority' or 'shortest'
+        value = self.get_value(args, '--order=')
+        self.order: str = str(value) if value else 'grid'
+
+        # Wall time budget of the sweep, in seconds or with m/h suffix,
+        # runs that can't finish in time aren't started
+        value = self.get_value(args, 'time-budget')
+        self.time_budget: float = self.parse_duration(str(value)) if value else 0
+
+        # Behaviors share combo indices instead of being crossed
+        self.zip_behaviors: bool = self.get_value(args, 'zip-behaviors') is not None
+
+        # Max. number of runs, required for sampling
+        value = self.get_value(args, 'max-runs')
+        self.max_runs: int = int(value) if value else 0
+
+        # Must be parsed before 'sampler'
+        value = self.get_value(args, 'sampler-seed')
+        self.sampler_seed: int = int(value) if value else 0
+
+        # How to sample values: 'random', 'lhs' or 'sobol', grid search if not set
+        value = self.get_value(args, 'sampler')
+        self.sampler: str = str(value) if value else None
+
+        # Where to read scalar values from: 'tensorboard' or 'events'
+        value = self.get_value(args, 'metric-source')
+        self.metric_source: str = str(value) if value else 'tensorboard'
+
+        # mlagents-learn arg, needs to be passed on to the subprocesses
+        value = self.peek_value(args, 'results-dir')
+        self.results_dir: str = str(value) if value else 'results'
+
+        # Path of the result cache file, 'off' disables caching
+        value = self.get_value(args, 'run-cache')
+        self.run_cache: str = str(value) if value else os.path.join(self.results_dir, 'run_cache.jsonl')
+
+        # Tune the number of active slots (up to num-envs) for max. throughput
+        self.adaptive_slots: bool = self.get_value(args, 'adaptive-slots') is not None
+
+        # Seconds of throughput measurements per adaptive concurrency level
+        value = self.get_value(args, 'adapt-window')
+        self.adapt_window: int = int(value) if value else 0
+
+        # Count runs and estimate the sweep's wall time without training
+        self.plan: bool = self.get_value(args, '--plan') is not None
+
+        # Steps/sec per slot for --plan, measured in earlier sweeps if not set
+        value = self.get_value(args, 'steps-per-sec')
+        self.steps_per_sec: float = float(value) if value else 0
+
+        # Tags to summarize, comma separated, all tags if empty, defaults to rank-tag
+        value = self.get_value(args, 'summary-tags')
+        self.summary_tags: List[str] = None if value is None else [t for t in str(value).split(',') if t]
+
+        # Leaderboard path (.csv or .parquet), defaults to summary.csv next to the config
+        value = self.get_value(args, 'summary-path')
+        self.summary_path: str = str(value) if value else None
+
+        # Number of processes for reading event files, defaults to the number of CPUs
+        value = self.get_value(args, 'summary-workers')
+        self.summary_workers: int = int(value) if value else 0
+
         self.env_args: List[str] = args
 
     """
@@ -57,6 +231,33 @@ class ArgParser():
             del args[l[0]]
         return value
 
+    """
+    Returns argument value for a specified search string,
+    without removing the argument from the list.
+
+    :param List[str] args: arguments list
+    :param str search: search string
+    :return: argument value
+    :rtype: Any
+    """
+
+    def peek_value(self, args: List[str], search: str) -> Any:
+        return self.get_value(args.copy(), search)
+
+    """
+    Converts a duration like 3600, 90m or 12h to seconds.
+
+    :param str value: duration, seconds if there is no m/h suffix
+    :return: seconds
+    :rtype: float
+    """
+
+    def parse_duration(self, value: str) -> float:
+        factors: Dict[str, int] = {'s': 1, 'm': 60, 'h': 3600}
+        if value[-1:].lower() in factors:
+            return float(value[:-1]) * factors[value[-1].lower()]
+        return float(value)
+
     """
     Returns a run ID with # suffix
 
@@ -74,13 +275,24 @@ class ArgParser():
     :param int n: run count
     :param int i: slot index
     :param str config_path: config path for training run
+    :param bool resume: whether to resume a previous run
+    :param List[int] cpus: CPUs to pin the process to, if any
+    :param str initialize_from: run ID to initialize the model from, if any
     :return: arguments list
     :rtype: List[str]
     """
 
-    def get_process_args(self, n: int, i: int, config_path: str) -> List[str]:
+    def get_process_args(self, n: int, i: int, config_path: str, resume: bool = False,
+                         cpus: List[int] = None, initialize_from: str = None) -> List[str]:
         args: List[str] = ['mlagents-learn', config_path, f'--run-id={self.get_run_id(n)}',
                            f'--base-port={self.base_port + i}']
+        if cpus:
+            # Child processes (the Unity environments) inherit the affinity
+            args = ['taskset', '-c', ','.join(map(str, cpus))] + args
+        if resume:
+            args.append('--resume')
+        if initialize_from:
+            args.append(f'--initialize-from={initialize_from}')
         args.extend(self.env_args)
         return args
 
@@ -89,70 +301,190 @@ class ArgParser():
 
 
 """
-Util for transforming config keys.
+Stores value options for config param.
 """
 
 
-class KeyUtil():
-    incr = 0
-    join = '___'
+class ValueOption():
+    """
+    :param Tuple[str, ...] path: keys leading to the config param, starting at the behavior settings
+    :param List[Any] values: list of possible values
+    :param str link: name of linked options group, if any
+    :param List[float] priorities: priority by value for the 'priority' run order, if any
+    """
+
+    def __init__(self, path: Tuple[str, ...], values: List[Any], link: str = None, priorities: List[float] = None):
+        self.path: Tuple[str, ...] = path
+        self.key: str = path[-1]
+        self.values: List[Any] = values
+        self.link: str = link
+        self.priorities: List[float] = priorities
+        assert priorities is None or len(priorities) == len(values), \
+            f'Number of priorities and values in {self.key} must match.'
+        log(f'Found config param option - {self}')
+
+    """
+    Maps a sample coordinate to one of the values.
 
+    :param float u: coordinate in [0, 1)
+    :return: value
+    :rtype: Any
     """
-    Makes the key unique by appending a numerical value.
 
-    :param str key: simple key
-    :return: unique key
-    :rtype: str
+    def get_value(self, u: float) -> Any:
+        return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+
+    def __str__(self) -> str:
+        link: str = f' (linked: {self.link})' if self.link else ''
+        return f'{self.key}: {", ".join(map(str, self.values))}{link}'
+
+
+"""
+Stores a continuous value range for config param.
+Values are integers if both low and high are integers.
+"""
+
+
+class RangeOption():
+    """
+    :param Tuple[str, ...] path: keys leading to the config param, starting at the behavior settings
+    :param Dict[str, Any] params: low/high/log params
+    :param str link: name of linked options group, if any
     """
 
-    def unique(key: str) -> str:
-        KeyUtil.incr += 1
-        return key + KeyUtil.join + str(KeyUtil.incr)
+    def __init__(self, path: Tuple[str, ...], params: Dict[str, Any], link: str = None):
+        self.path: Tuple[str, ...] = path
+        self.key: str = path[-1]
+        assert 'low' in params and 'high' in params, f'No low/high limits found in {self.key} range.'
+        self.link: str = link
+        self.low: float = params['low']
+        self.high: float = params['high']
+        self.log: bool = bool(params['log'] if 'log' in params else False)
+        self.int: bool = isinstance(self.low, int) and isinstance(self.high, int)
+        assert not self.log or self.low > 0, f'Log scale range {self.key} must be positive.'
+        log(f'Found config param range - {self}')
 
     """
-    Simplifies the key by removing the numerical value.
+    Maps a sample coordinate to the value range.
 
-    :param str key: unique key
-    :return: simple key
-    :rtype: str
+    :param float u: coordinate in [0, 1)
+    :return: value
+    :rtype: Any
     """
 
-    def simple(key: str) -> str:
-        return key.split(KeyUtil.join)[0]
+    def get_value(self, u: float) -> Any:
+        # Integer ranges include high
+        high: float = self.high + 1 if self.int else self.high
+        if self.log:
+            value: float = math.exp(math.log(self.low) + u * (math.log(high) - math.log(self.low)))
+        else:
+            value: float = self.low + u * (high - self.low)
+        return min(int(value), self.high) if self.int else value
+
+    def __str__(self) -> str:
+        link: str = f' (linked: {self.link})' if self.link else ''
+        return f'{self.key}: {self.low} - {self.high}{" (log)" if self.log else ""}{link}'
 
 
 """
-Stores value options for config param.
+Generates sample points in the unit hypercube.
+Points are generated once, their number is bounded by the run budget.
 """
 
 
-class ValueOption():
+class Sampler():
     """
-    :param str key: name of config param
-    :param List[Any] values: list of possible values
+    :param str method: 'random', 'lhs' (Latin hypercube) or 'sobol'
+    :param int num_points: number of points
+    :param int num_dims: number of dimensions
+    :param int seed: random seed
     """
 
-    def __init__(self, key: str, values: List[Any]):
-        self.key: str = key
-        self.values: List[Any] = values
-        log(f'Found config param option - {self}')
+    def __init__(self, method: str, num_points: int, num_dims: int, seed: int):
+        self.rng: random.Random = random.Random(seed)
+        if method == 'sobol':
+            self.points: List[List[float]] = self.sobol(num_points, num_dims, seed)
+        elif method == 'random':
+            self.points: List[List[float]] = [[self.rng.random() for _ in range(num_dims)]
+                                              for _ in range(num_points)]
+        else:
+            self.points: List[List[float]] = self.latin_hypercube(num_points, num_dims)
 
-    def __str__(self) -> str:
-        return f'{KeyUtil.simple(self.key)}: {", ".join(map(str, self.values))}'
+    """
+    Returns a sample point.
+
+    :param int n: point index
+    :return: coordinates in [0, 1)
+    :rtype: List[float]
+    """
+
+    def get_point(self, n: int) -> List[float]:
+        return self.points[n]
+
+    """
+    Replaces a sample point, e.g. with a model based suggestion.
+
+    :param int n: point index, points are added if it's out of range
+    :param List[float] point: coordinates in [0, 1)
+    :rtype: None
+    """
+
+    def set_point(self, n: int, point: List[float]) -> None:
+        if n >= len(self.points):
+            # Points of runs added at runtime
+            self.points.extend([None] * (n + 1 - len(self.points)))
+        self.points[n] = point
+
+    """
+    Latin hypercube sampling: every dimension is split into num_points
+    strata, each stratum is sampled exactly once.
+
+    :param int num_points: number of points
+    :param int num_dims: number of dimensions
+    :return: list of points
+    :rtype: List[List[float]]
+    """
+
+    def latin_hypercube(self, num_points: int, num_dims: int) -> List[List[float]]:
+        columns: List[List[float]] = []
+        for _ in range(num_dims):
+            strata: List[int] = list(range(num_points))
+            self.rng.shuffle(strata)
+            columns.append([(k + self.rng.random()) / num_points for k in strata])
+        return [[c[n] for c in columns] for n in range(num_points)]
+
+    """
+    Scrambled Sobol sequence, requires scipy.
+    Falls back to Latin hypercube sampling if scipy isn't installed.
+
+    :param int num_points: number of points
+    :param int num_dims: number of dimensions
+    :param int seed: random seed
+    :return: list of points
+    :rtype: List[List[float]]
+    """
+
+    def sobol(self, num_points: int, num_dims: int, seed: int) -> List[List[float]]:
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            log('Sobol sampling requires scipy, using Latin hypercube sampling instead.')
+            return self.latin_hypercube(num_points, num_dims)
+        return qmc.Sobol(d=max(num_dims, 1), seed=seed).random(num_points).tolist()
 
 
 """
 Stop condition for training runs.
-A run can stop prematurely if the latest scalar value for a 
-specified metric (tag) is outside of specified min/max limits.
+A run can stop prematurely if the latest (smoothed) scalar value for a 
+specified metric (tag) is outside of specified min/max limits, if its
+trend is below min_slope, if it plateaus for longer than patience steps,
+or if it is below a percentile of the other runs' values at the same step.
 """
 
 
 class StopCondition():
-    tb_api = 'http://localhost:6006/data/plugin/scalars/scalars?'
-
     """
-    :param Dict[str, Any] params: tag/step/min/max params
+    :param Dict[str, Any] params: tag/step/min/max and optional smoothing, slope and plateau params
     """
 
     def __init__(self, params: Dict[str, Any]):
@@ -162,45 +494,532 @@ class StopCondition():
         self.max: float = float(params['max'] if 'max' in params else 999999999)
         self.max = max(self.max, self.min)
         self.step: int = int(params['step'] if 'step' in params else 0)
+        # min/max are compared with an exponential moving average (smoothing factor 0 - 1)
+        # or with the mean of the last {window} values, if set
+        self.ema: float = float(params['ema']) if 'ema' in params else None
+        self.window: int = int(params['window']) if 'window' in params else None
+        # Min. least squares slope (value change per step) over the last {window} values
+        self.min_slope: float = float(params['min_slope']) if 'min_slope' in params else None
+        if self.min_slope is not None and self.window is None:
+            self.window = 10
+        # Stop if the (smoothed) value hasn't improved by more than {min_delta} in {patience} steps
+        self.patience: int = int(params['patience']) if 'patience' in params else None
+        self.min_delta: float = float(params.get('min_delta', 0))
+        # Stop if the (smoothed) value is below the {percentile} of the values other runs
+        # had at the same step, requires at least {min_runs} other runs that reached the step
+        self.percentile: float = float(params['percentile']) if 'percentile' in params else None
+        if params.get('median'):
+            self.percentile = 50.0
+        self.min_runs: int = int(params.get('min_runs', 3))
+        assert self.percentile is None or 0 <= self.percentile <= 100, \
+            f'Stop condition percentile for {self.tag} must be in [0, 100].'
+        assert self.ema is None or 0 < self.ema <= 1, f'Stop condition ema for {self.tag} must be in (0, 1].'
+        assert self.window is None or self.window > 1, f'Stop condition window for {self.tag} must be > 1.'
+        # Incremental statistics by verbose run id
+        self.stats: Dict[str, SeriesStats] = {}
+        # (step, smoothed value) histories of finished runs by verbose run id
+        self.finished: Dict[str, List[Tuple[int, float]]] = {}
         log(f'Found stop condition - {self}')
 
     """
-    Calls TensorBoard HTTP API for specified run and checks whether 
-    the latest scalar value for {tag} is outside of min/max limits.
-
-    :param str run_id: run id
-    :return: true if value is out of min/max limits
-    :return: message if value is out of min/max limits 
+    Checks whether the latest (smoothed) scalar value is outside of min/max limits,
+    whether the trend is below min_slope, or whether the value has plateaued.
+    Only values that were added since the previous call are processed.
+
+    :param List[Tuple[int, float]] data: (step, value) tuples for {tag}
+    :param str run_id: verbose run id, for keeping track of the run's statistics
+    :return: true if the run must stop
+    :return: message if the run must stop
     :rtype: bool
     """
 
-    def evaluate(self, run_id: str) -> Union[bool, str]:
-        args: Dict[str, str] = {'run': run_id, 'tag': self.tag}
-        url: str = StopCondition.tb_api + urllib.parse.urlencode(args)
+    def evaluate(self, data: List[Tuple[int, float]], run_id: str = None) -> Union[bool, str]:
+        if not data:
+            return False, None  # No scalar data yet.
+        if run_id not in self.stats:
+            self.stats[run_id] = SeriesStats(self.ema, self.window, self.percentile is not None)
+        stats: SeriesStats = self.stats[run_id]
+        stats.update(data, self.min_delta)
+
+        step: int = stats.last_step
+        if step < self.step:
+            return False, None
+        value: float = stats.get_value()
+        name: str = self.tag if self.ema is None and self.window is None else f'{self.tag} (smoothed)'
+        if value < self.min:
+            return True, f'{name}: {value} < {self.min} [step: {step}]'
+        elif value > self.max:
+            return True, f'{name}: {value} > {self.max} [step: {step}]'
+        if self.min_slope is not None:
+            slope: float = stats.get_slope()
+            if slope is not None and slope < self.min_slope:
+                return True, f'{self.tag}: slope {slope:.3g} < {self.min_slope} per step [step: {step}]'
+        if self.patience is not None and step - stats.best_step >= self.patience:
+            return True, f'{name}: no improvement > {self.min_delta} in {step - stats.best_step} steps ' \
+                         f'[step: {step}]'
+        if self.percentile is not None:
+            cutoff: float = self.get_cutoff(run_id, step)
+            if cutoff is not None and value < cutoff:
+                return True, f'{name}: {value} < {cutoff} ({self.percentile:g}th percentile of other runs) ' \
+                             f'[step: {step}]'
+        return False, None
+
+    """
+    Returns the {percentile} of the values other runs of the same behavior had at
+    a specified step, linearly interpolated between their nearest recorded steps.
+    Runs that haven't reached the step yet are ignored.
+
+    :param str run_id: verbose run id
+    :param int step: step
+    :return: percentile value, None if less than {min_runs} runs reached the step
+    :rtype: float
+    """
+
+    def get_cutoff(self, run_id: str, step: int) -> float:
+        behavior: str = os.path.basename(run_id)
+        histories: Dict[str, List[Tuple[int, float]]] = dict(self.finished)
+        histories.update({id: stats.history for id, stats in self.stats.items()})
+        values: List[float] = []
+        for id, history in histories.items():
+            if id == run_id or os.path.basename(id) != behavior or not history or history[-1][0] < step:
+                continue
+            j: int = bisect.bisect_left(history, (step, -math.inf))
+            (x1, y1) = history[j]
+            if x1 == step or j == 0:
+                values.append(y1)
+            else:
+                (x0, y0) = history[j - 1]
+                values.append(y0 + (y1 - y0) * (step - x0) / (x1 - x0))
+        if len(values) < max(self.min_runs, 1):
+            return None
+        values.sort()
+        k: float = (len(values) - 1) * self.percentile / 100
+        lower: int = math.floor(k)
+        upper: int = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+    """
+    Discards the statistics of a finished run.
+    Its history is kept for comparisons with other runs.
+
+    :param str run_id: verbose run id
+    :rtype: None
+    """
+
+    def reset(self, run_id: str) -> None:
+        stats: SeriesStats = self.stats.pop(run_id, None)
+        if stats is not None and stats.history:
+            self.finished[run_id] = stats.history
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __str__(self) -> str:
+        result: str = f'tag: {self.tag}, step: {self.step}, min: {str(self.min)}, max: {str(self.max)}'
+        for key in ('ema', 'window', 'min_slope', 'patience', 'percentile'):
+            if getattr(self, key) is not None:
+                result += f', {key}: {getattr(self, key)}'
+        if self.patience is not None:
+            result += f', min_delta: {self.min_delta}'
+        if self.percentile is not None:
+            result += f', min_runs: {self.min_runs}'
+        return result
+
+
+"""
+Incremental statistics of a run's scalar series: exponential moving average,
+mean and least squares slope over a sliding window (from running sums),
+the best smoothed value so far and optionally the smoothed value history.
+"""
+
+
+class SeriesStats():
+    """
+    :param float ema: EMA smoothing factor, None if not used
+    :param int window: sliding window size, None if not used
+    :param bool keep_history: whether to record (step, smoothed value) tuples
+    """
+
+    def __init__(self, ema: float, window: int, keep_history: bool = False):
+        self.alpha: float = ema
+        self.window: int = window
+        self.last_step: int = -1
+        self.last_value: float = None
+        self.ema: float = None
+        # (step, value) tuples in the window, and running sums over them.
+        # Steps are relative to the first step, for numerical stability.
+        self.points: Deque[Tuple[int, float]] = deque(maxlen=window)
+        self.origin: int = None
+        self.sums: List[float] = [0.0] * 4  # x, y, xy, xx
+        self.best: float = -math.inf
+        self.best_step: int = 0
+        self.keep_history: bool = keep_history
+        self.history: List[Tuple[int, float]] = []
+
+    """
+    Adds the values with steps after the last processed step.
+
+    :param List[Tuple[int, float]] data: (step, value) tuples
+    :param float min_delta: min. improvement of the best value
+    :rtype: None
+    """
+
+    def update(self, data: List[Tuple[int, float]], min_delta: float) -> None:
+        start: int = len(data)
+        while start > 0 and data[start - 1][0] > self.last_step:
+            start -= 1
+        for step, value in data[start:]:
+            if step <= self.last_step:
+                continue  # Steps logged again after resuming
+            self.add(step, value)
+            smoothed: float = self.get_value()
+            if self.keep_history:
+                self.history.append((step, smoothed))
+            if smoothed > self.best + min_delta or self.best == -math.inf:
+                self.best = smoothed
+                self.best_step = step
+
+    """
+    Adds a single value.
+
+    :param int step: step
+    :param float value: scalar value
+    :rtype: None
+    """
+
+    def add(self, step: int, value: float) -> None:
+        self.last_step = step
+        self.last_value = value
+        if self.alpha is not None:
+            self.ema = value if self.ema is None else self.alpha * value + (1 - self.alpha) * self.ema
+        if self.window is not None:
+            if self.origin is None:
+                self.origin = step
+            if len(self.points) == self.window:
+                # The oldest point is dropped by the append
+                x, y = self.points[0]
+                self.push(x, y, -1)
+            self.push(step - self.origin, value, 1)
+            self.points.append((step - self.origin, value))
+
+    """
+    Adds a point to or removes it from the running sums.
+
+    :param float x: relative step
+    :param float y: value
+    :param int sign: 1 to add, -1 to remove
+    :rtype: None
+    """
+
+    def push(self, x: float, y: float, sign: int) -> None:
+        self.sums[0] += sign * x
+        self.sums[1] += sign * y
+        self.sums[2] += sign * x * y
+        self.sums[3] += sign * x * x
+
+    """
+    Returns the EMA if set, the window mean if set, or the latest value.
+
+    :return: (smoothed) value
+    :rtype: float
+    """
+
+    def get_value(self) -> float:
+        if self.ema is not None:
+            return self.ema
+        if self.points:
+            return self.sums[1] / len(self.points)
+        return self.last_value
+
+    """
+    Returns the least squares slope over the window, once it is full.
+
+    :return: value change per step, None if not available
+    :rtype: float
+    """
+
+    def get_slope(self) -> float:
+        n: int = len(self.points)
+        if self.window is None or n < self.window:
+            return None
+        sx, sy, sxy, sxx = self.sums
+        denominator: float = n * sxx - sx * sx
+        if denominator <= 0:
+            return None
+        return (n * sxy - sx * sy) / denominator
+
+
+"""
+Reads scalar values from TensorBoard's HTTP API.
+Requires TensorBoard to be running at localhost:6006.
+Connections are pooled, so concurrent queries can reuse them.
+"""
+
+
+class TensorBoardSource():
+    tb_api = 'http://localhost:6006/data/plugin/scalars/scalars?'
+
+    """
+    :param int pool_size: max. number of pooled connections
+    """
+
+    def __init__(self, pool_size: int):
+        self.session: requests.Session = requests.Session()
+        adapter: requests.adapters.HTTPAdapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                                               pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+
+    """
+    Returns all scalar values for specified run and tag.
+
+    :param str run_id: verbose run id
+    :param str tag: TensorBoard tag
+    :return: list of (step, value) tuples, empty if no data is available
+    :rtype: List[Tuple[int, float]]
+    """
+
+    def get_scalars(self, run_id: str, tag: str) -> List[Tuple[int, float]]:
+        args: Dict[str, str] = {'run': run_id, 'tag': tag}
+        url: str = TensorBoardSource.tb_api + urllib.parse.urlencode(args)
         try:
-            r: Response = requests.get(url=url, verify=False, timeout=5)
+            r: requests.Response = self.session.get(url=url, verify=False, timeout=5)
             if r.status_code == requests.codes.ok:
+                # [wall_time, step, value] for each scalar
                 data: List[List[float]] = json.loads(r.text)
-                step: int = data[-1][1]  # Latest step
-                value: float = data[-1][2]  # Latest scalar
-                if step >= self.step:
-                    if value < self.min:
-                        return True, f'{self.tag}: {value} < {self.min} [step: {step}]'
-                    elif value > self.max:
-                        return True, f'{self.tag}: {value} > {self.max} [step: {step}]'
+                return [(int(d[1]), d[2]) for d in data]
             # else:
             # log(r.text)
             # No scalar data yet.
-        except:
+        except requests.RequestException:
             log('Could not connect to TensorBoard.')
 
-        return False, None
+        return []
 
-    def __eq__(self, other):
-        return self.tag == other.tag
 
-    def __str__(self) -> str:
-        return f'tag: {self.tag}, step: {self.step}, min: {str(self.min)}, max: {str(self.max)}'
+"""
+Reads scalar values directly from the tfevents files mlagents-learn
+writes to results/<run-id>/<behavior>/, no TensorBoard server required.
+Files are tailed: only records appended since the last read are decoded.
+"""
+
+
+class EventFileSource():
+    """
+    :param str results_dir: mlagents-learn results directory
+    """
+
+    def __init__(self, results_dir: str):
+        self.results_dir: str = results_dir
+        # Readers by event file path
+        self.readers: Dict[str, EventFileReader] = {}
+        # Scalar values by verbose run id and tag
+        self.scalars: Dict[str, Dict[str, List[Tuple[int, float]]]] = {}
+        # Queries can run concurrently, but readers must not
+        self.lock: threading.Lock = threading.Lock()
+
+    """
+    Returns all scalar values for specified run and tag.
+
+    :param str run_id: verbose run id
+    :param str tag: TensorBoard tag
+    :return: list of (step, value) tuples, empty if no data is available
+    :rtype: List[Tuple[int, float]]
+    """
+
+    def get_scalars(self, run_id: str, tag: str) -> List[Tuple[int, float]]:
+        with self.lock:
+            self.update(run_id)
+            return self.scalars.get(run_id, {}).get(tag, [])
+
+    """
+    Decodes new records from all event files of specified run.
+    A resumed run writes an additional event file.
+
+    :param str run_id: verbose run id
+    :rtype: None
+    """
+
+    def update(self, run_id: str) -> None:
+        pattern: str = os.path.join(self.results_dir, run_id, 'events.out.tfevents.*')
+        series: Dict[str, List[Tuple[int, float]]] = self.scalars.setdefault(run_id, {})
+        for path in sorted(glob.glob(pattern)):
+            if path not in self.readers:
+                self.readers[path] = EventFileReader(path)
+            for tag, step, value in self.readers[path].read():
+                series.setdefault(tag, []).append((step, value))
+
+
+"""
+Incrementally reads scalar summaries from a tfevents file.
+The file is a sequence of TFRecords, each containing a serialized
+Event protocol buffer, which is decoded without TensorFlow.
+"""
+
+
+class EventFileReader():
+    """
+    :param str path: event file path
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        # Byte offset of the first record that hasn't been read yet
+        self.offset: int = 0
+
+    """
+    Reads all complete records appended since the last call.
+
+    :return: list of (tag, step, value) tuples
+    :rtype: List[Tuple[str, int, float]]
+    """
+
+    def read(self) -> List[Tuple[str, int, float]]:
+        result: List[Tuple[str, int, float]] = []
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                while True:
+                    # uint64 length, uint32 length crc, data, uint32 data crc
+                    header: bytes = f.read(12)
+                    if len(header) < 12:
+                        break
+                    length: int = struct.unpack('<Q', header[:8])[0]
+                    data: bytes = f.read(length + 4)
+                    if len(data) < length + 4:
+                        break  # Record is still being written
+                    self.offset += 12 + length + 4
+                    try:
+                        result.extend(self.decode_event(data[:length]))
+                    except (IndexError, ValueError, struct.error):
+                        log(f'Skipping corrupt record in {self.path}.')
+        except OSError:
+            log(f'Could not read {self.path}.')
+        return result
+
+    """
+    Decodes scalar values from a serialized Event message.
+
+    :param bytes data: Event message
+    :return: list of (tag, step, value) tuples
+    :rtype: List[Tuple[str, int, float]]
+    """
+
+    def decode_event(self, data: bytes) -> List[Tuple[str, int, float]]:
+        step: int = 0
+        summaries: List[bytes] = []
+        for field, wire, value in self.iter_fields(data):
+            if field == 2 and wire == 0:  # Event.step
+                step = value
+            elif field == 5 and wire == 2:  # Event.summary
+                summaries.append(value)
+
+        result: List[Tuple[str, int, float]] = []
+        for summary in summaries:
+            for field, wire, value in self.iter_fields(summary):
+                if field == 1 and wire == 2:  # Summary.value
+                    scalar: Tuple[str, float] = self.decode_value(value)
+                    if scalar is not None:
+                        result.append((scalar[0], step, scalar[1]))
+        return result
+
+    """
+    Decodes tag and scalar from a serialized Summary.Value message.
+    Scalars are either stored as simple_value or as a single
+    element float/double tensor.
+
+    :param bytes data: Summary.Value message
+    :return: (tag, value) tuple or None if value is not a scalar
+    :rtype: Tuple[str, float]
+    """
+
+    def decode_value(self, data: bytes) -> Tuple[str, float]:
+        tag: str = None
+        value: float = None
+        for field, wire, v in self.iter_fields(data):
+            if field == 1 and wire == 2:  # Value.tag
+                tag = v.decode('utf-8')
+            elif field == 2 and wire == 5:  # Value.simple_value
+                value = struct.unpack('<f', v)[0]
+            elif field == 8 and wire == 2:  # Value.tensor
+                value = self.decode_tensor(v)
+        return (tag, value) if tag is not None and value is not None else None
+
+    """
+    Decodes the first element of a serialized float/double TensorProto message.
+
+    :param bytes data: TensorProto message
+    :return: scalar value or None
+    :rtype: float
+    """
+
+    def decode_tensor(self, data: bytes) -> float:
+        dtype: int = 0
+        content: bytes = None
+        values: List[float] = []
+        for field, wire, v in self.iter_fields(data):
+            if field == 1 and wire == 0:  # dtype, 1: DT_FLOAT, 2: DT_DOUBLE
+                dtype = v
+            elif field == 4 and wire == 2:  # tensor_content
+                content = v
+            elif field == 5:  # float_val, packed or not
+                values.extend(struct.unpack(f'<{len(v) // 4}f', v))
+            elif field == 6:  # double_val, packed or not
+                values.extend(struct.unpack(f'<{len(v) // 8}d', v))
+        if values:
+            return values[0]
+        if content and dtype == 1:
+            return struct.unpack('<f', content[:4])[0]
+        if content and dtype == 2:
+            return struct.unpack('<d', content[:8])[0]
+        return None
+
+    """
+    Iterates over the fields of a serialized protocol buffer message.
+
+    :param bytes data: message
+    :return: (field number, wire type, value) tuples, value is an int for
+    varints and bytes for all other wire types
+    :rtype: Iterator[Tuple[int, int, Any]]
+    """
+
+    def iter_fields(self, data: bytes) -> Iterator[Tuple[int, int, Any]]:
+        pos: int = 0
+        while pos < len(data):
+            key, pos = self.read_varint(data, pos)
+            field: int = key >> 3
+            wire: int = key & 7
+            if wire == 0:
+                value, pos = self.read_varint(data, pos)
+            elif wire == 1:
+                value, pos = data[pos:pos + 8], pos + 8
+            elif wire == 2:
+                length, pos = self.read_varint(data, pos)
+                value, pos = data[pos:pos + length], pos + length
+            elif wire == 5:
+                value, pos = data[pos:pos + 4], pos + 4
+            else:
+                raise ValueError(f'Unsupported wire type {wire}.')
+            yield field, wire, value
+
+    """
+    Reads a varint from a serialized protocol buffer message.
+
+    :param bytes data: message
+    :param int pos: varint position
+    :return: varint value and position after varint
+    :rtype: Tuple[int, int]
+    """
+
+    def read_varint(self, data: bytes, pos: int) -> Tuple[int, int]:
+        result: int = 0
+        shift: int = 0
+        while True:
+            b: int = data[pos]
+            pos += 1
+            result |= (b & 0x7f) << shift
+            if not b & 0x80:
+                return result, pos
+            shift += 7
 
 
 """
@@ -209,65 +1028,42 @@ Stores behavior specific info.
 
 
 class Behavior():
+    # mlagents-learn default
+    default_max_steps = 500000
+
     """
     :param str name: behavior name
-    :param str run_id: run id
     :param Dict[str, Any] config: behavior config settings
     :param Dict[str, Any] defaults: default settings if available
     """
 
-    def __init__(self, name: str, run_id: str, config: Dict[str, Any], defaults: Dict[str, Any]):
+    def __init__(self, name: str, config: Dict[str, Any], defaults: Dict[str, Any]):
         self.name: str = name
-        # Objects generated from opt_values and opt_stop fields
-        self.value_options: List[ValueOption] = []
+        # Objects generated from opt_values, opt_choice, opt_range and opt_stop fields
+        self.value_options: List[Union[ValueOption, RangeOption]] = []
         self.stop_conditions: List[StopCondition] = []
 
-        # Run IDs for each value combination,
-        # verbose run IDs contain behavior name: RunID-#/BehaviorName
-        # that's how they are listed in TensorBoard
-        self.verbose_run_ids: List[str] = []
-        # Info strings for each value combination
-        self.value_infos: List[List[str]] = []
-        # Config settings for each value combination
-        self.mod_configs: List[Dict[str, Any]] = []
-
         if defaults is not None:
             self.copy_defaults(config, defaults)
-        # Make keys unique
-        parsed: Dict[str, Any] = self.parse_config(self.unique_keys(config))
-
-        if self.value_options:
-            # List of param names we have optional values for
-            param_names: List[str] = [x.key for x in self.value_options]
-            # Create all possible combinations of optional values
-            value_combos: List[List[Any]] = self.get_value_combinations()
-            # Create specific config settings for each value combination
-            for i, value_combo in enumerate(value_combos):
-                mod_config: Dict[str, Any] = self.insert_values(parsed, param_names, value_combo)
-                # Revert unique keys back to simple ones
-                self.mod_configs.append(self.simple_keys(mod_config))
-
-                self.verbose_run_ids.append(f'{run_id}-{str(i)}\{name}')
-                # Info for value options:
-                # RunID-#
-                # - Behavior name
-                #   - param1 name: param1 value
-                #   - param2 name: param2 value
-                # ...
-                value_info: List[str] = [f'\n{run_id}-{str(i)}\n- {name}\n']
-                for j, param_name in enumerate(param_names):
-                    # param_names still has unique keys
-                    key: str = KeyUtil.simple(param_name)
-                    value_info.append(f'  - {key}: {str(value_combo[j])}\n')
-                self.value_infos.append(value_info)
-        else:
-            # No value options, keep behavior as is
-            self.mod_configs.append(self.simple_keys(parsed))
-            self.verbose_run_ids.append(f'{run_id}-0\{name}')
-            self.value_infos.append([f'- {name}\n', '  - no value options\n'])
+        # Base config settings without 'opt_' params, shared by all value combinations
+        self.parsed: Dict[str, Any] = self.parse_config(config)
+        # Value option indices by key, nested like the config params they override.
+        # Only these paths are copied when values are inserted.
+        self.overrides: Dict[str, Any] = self.get_overrides()
+        # Continuous ranges can only be sampled
+        self.has_ranges: bool = any(isinstance(x, RangeOption) for x in self.value_options)
+        # Value option indices by axis. Options with the same opt_link
+        # share an axis and change together, all others get their own axis.
+        self.axes: List[List[int]] = self.get_axes()
+        # Number of value combinations, computed without generating them
+        self.num_combos: int = 1
+        for axis in self.axes:
+            option: Union[ValueOption, RangeOption] = self.value_options[axis[0]]
+            if isinstance(option, ValueOption):
+                self.num_combos *= len(option.values)
 
     def __str__(self) -> str:
-        return f'run_ids: {", ".join(self.run_ids)}'
+        return f'{self.name}: {str(self.num_combos)} value combination(s)'
 
     """
     Copies default settings into behavior config settings.
@@ -292,102 +1088,184 @@ class Behavior():
     """
     Parses the 'opt_' params in config yaml.
     Returns a config settings copy without those params.
-    Generates ValueOption and StopCondition objects.
+    Generates ValueOption, RangeOption and StopCondition objects.
 
     :param Dict[str, Any] config: behavior config settings
-    :param str key: config param name
+    :param Tuple[str, ...] path: keys leading to the config settings
     :return: updated config settings copy
     :rtype: Dict[str, Any]
     """
 
-    def parse_config(self, config: Dict[str, Any], key: str = None) -> Dict[str, Any]:
+    def parse_config(self, config: Dict[str, Any], path: Tuple[str, ...] = ()) -> Dict[str, Any]:
         result: Dict[str, Any] = {}
         for k, v in config.items():
-            if 'opt_values' in k:
-                self.value_options.append(ValueOption(key, v))
+            if 'opt_values' in k or 'opt_choice' in k or 'opt_range' in k:
+                if not path:
+                    raise ValueError(f'{k} in {self.name} must be set for a config param.')
+                if 'opt_range' in k:
+                    self.value_options.append(RangeOption(path, v, config.get('opt_link')))
+                else:
+                    self.value_options.append(ValueOption(path, v, config.get('opt_link'),
+                                                          config.get('opt_priority')))
             elif 'opt_stop' in k:
                 self.stop_conditions.append(StopCondition(v))
-            if isinstance(v, dict):
-                v = self.parse_config(v, k)
+            elif isinstance(v, dict):
+                v = self.parse_config(v, path + (k,))
             if 'opt_' not in k:
                 result[k] = v
         return result
 
     """
-    Generates option value combinations.
+    Builds the nested override index from the value options' key paths.
 
-    :param List[List[Any]] result: value combination list
-    :param List[Any] tmp: temp. value list
-    :param int i: value option index
-    :return: list of all value combinations
-    :rtype: List[List[Any]]
+    :return: value option index or nested dict by key
+    :rtype: Dict[str, Any]
     """
 
-    def get_value_combinations(self, result: List[List[Any]] = None, tmp: List[Any] = None, i: int = 0) -> List[
-        List[Any]]:
-        n: int = len(self.value_options)
-        result: List[List[Any]] = [] if result is None else result
-        tmp: List[Any] = [None] * n if tmp is None else tmp
-        for v in self.value_options[i].values:
-            tmp[i] = v  # Current value by option index
-            if i is n - 1:
-                result.append(tmp.copy())
-            else:
-                self.get_value_combinations(result, tmp, i + 1)
+    def get_overrides(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for j, option in enumerate(self.value_options):
+            node: Dict[str, Any] = result
+            for k in option.path[:-1]:
+                node = node.setdefault(k, {})
+            node[option.key] = j
         return result
 
     """
-    Inserts value combination in config settings.
-    Returns a config settings copy with modified params.
+    Groups value options by opt_link name.
+    Linked value lists must have the same length.
 
-    :param Dict[str, Any] config: config settings
-    :param List[str] param_names: list of param names
-    :param List[Any] values: list of possible values
-    :return: updated config settings copy
-    :rtype: Dict[str, Any]
+    :return: value option indices by axis
+    :rtype: List[List[int]]
     """
 
-    def insert_values(self, config: Dict[str, Any], param_names: List[str], values: List[Any]) -> Dict[str, Any]:
-        result: Dict[str, Any] = {}
-        for k, v in config.items():
-            if isinstance(v, dict):
-                v = self.insert_values(v, param_names, values)
-            result[k] = values[param_names.index(k)] if k in param_names else v
+    def get_axes(self) -> List[List[int]]:
+        axes: List[List[int]] = []
+        links: Dict[str, List[int]] = {}
+        for j, option in enumerate(self.value_options):
+            if option.link is None:
+                axes.append([j])
+            elif option.link in links:
+                links[option.link].append(j)
+            else:
+                links[option.link] = [j]
+                axes.append(links[option.link])
+
+        for link, axis in links.items():
+            lengths: Set[int] = set(len(self.value_options[j].values) for j in axis
+                                    if isinstance(self.value_options[j], ValueOption))
+            if len(lengths) > 1:
+                raise ValueError(f'Linked options {link} in {self.name} have different numbers of values.')
+        return axes
+
+    """
+    Returns the option values for a specified combination index.
+    Combinations are ordered like a nested loop over all axes,
+    with the last axis changing fastest.
+
+    :param int i: value combination index
+    :return: value combination
+    :rtype: List[Any]
+    """
+
+    def get_value_combination(self, i: int) -> List[Any]:
+        result: List[Any] = [None] * len(self.value_options)
+        for axis in reversed(self.axes):
+            i, r = divmod(i, len(self.value_options[axis[0]].values))
+            for j in axis:
+                result[j] = self.value_options[j].values[r]
         return result
 
     """
-    Returns a config settings copy with unique key names.
+    Returns the option values for a specified sample point.
+    Linked options share a coordinate.
 
-    :param Dict[str, Any] config: behavior config settings
-    :param str key: config param name
-    :param bool ignore: whether to ignore the current key
-    :return: updated config settings copy
-    :rtype: Dict[str, Any]
+    :param List[float] point: one coordinate per axis
+    :return: value combination
+    :rtype: List[Any]
     """
 
-    def unique_keys(self, config: Dict[str, Any], key: str = None, ignore: bool = False) -> Dict[str, Any]:
-        result: Dict[str, Any] = {}
-        for k, v in config.items():
-            if isinstance(v, dict):
-                v = self.unique_keys(v, k, ignore or 'opt_' in k)
-            result[k if ignore or 'opt_' in k else KeyUtil.unique(k)] = v
+    def get_sampled_values(self, point: List[float]) -> List[Any]:
+        result: List[Any] = [None] * len(self.value_options)
+        for axis, u in zip(self.axes, point):
+            for j in axis:
+                result[j] = self.value_options[j].get_value(u)
         return result
 
     """
-    Returns a config settings copy with simple key names.
+    Returns config settings for a specified value combination.
+    Only the dicts along the overridden key paths are copied, all other
+    settings are shared with the base config and must not be modified.
 
-    :param Dict[str, Any] config: behavior config settings
-    :param str key: config param name
+    :param List[Any] values: one value per value option
+    :return: config settings with inserted values
+    :rtype: Dict[str, Any]
+    """
+
+    def get_mod_config(self, values: List[Any]) -> Dict[str, Any]:
+        return self.insert_values(self.parsed, self.overrides, values)
+
+    """
+    Returns a value combination as key path overrides.
+
+    :param List[Any] values: one value per value option
+    :return: [key path, value] pairs
+    :rtype: List[List[Any]]
+    """
+
+    def get_value_overrides(self, values: List[Any]) -> List[List[Any]]:
+        return [[list(option.path), value] for option, value in zip(self.value_options, values)]
+
+    """
+    Returns the value option or range of max_steps.
+
+    :return: max_steps option, None if max_steps isn't varied
+    :rtype: Union[ValueOption, RangeOption]
+    """
+
+    def get_max_steps_option(self) -> Union[ValueOption, RangeOption]:
+        return next((x for x in self.value_options if x.path == ('max_steps',)), None)
+
+    """
+    Returns the sum of the priorities of a value combination.
+
+    :param List[Any] values: one value per value option
+    :return: priority, 0 if no priorities are set
+    :rtype: float
+    """
+
+    def get_priority(self, values: List[Any]) -> float:
+        return sum(option.priorities[option.values.index(value)] for option, value in zip(self.value_options, values)
+                   if isinstance(option, ValueOption) and option.priorities)
+
+    """
+    Returns a canonical hash for config settings generated by this behavior.
+    Key order doesn't affect the hash.
+
+    :param Dict[str, Any] mod_config: config settings
+    :return: config hash
+    :rtype: str
+    """
+
+    def get_config_hash(self, mod_config: Dict[str, Any]) -> str:
+        content: str = json.dumps(mod_config, sort_keys=True, default=str)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    """
+    Inserts value combination in config settings.
+    Returns a shallow copy of each dict on an override path.
+
+    :param Dict[str, Any] config: config settings
+    :param Dict[str, Any] overrides: value option index or nested dict by key
+    :param List[Any] values: one value per value option
     :return: updated config settings copy
     :rtype: Dict[str, Any]
     """
 
-    def simple_keys(self, config: Dict[str, Any], key: str = None) -> Dict[str, Any]:
-        result: Dict[str, Any] = {}
-        for k, v in config.items():
-            if isinstance(v, dict):
-                v = self.simple_keys(v, k)
-            result[KeyUtil.simple(k)] = v
+    def insert_values(self, config: Dict[str, Any], overrides: Dict[str, Any], values: List[Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = dict(config)
+        for k, v in overrides.items():
+            result[k] = self.insert_values(config[k], v, values) if isinstance(v, dict) else values[v]
         return result
 
 
@@ -399,22 +1277,25 @@ Loads, parses and saves config settings.
 class Config():
     """
     :param ArgParser args: ArgParser instance
+    :param bool resume: whether an interrupted sweep is resumed
+    :param bool dry_run: only counts runs, doesn't generate sample points or write files
     """
 
-    def __init__(self, args: ArgParser):
+    def __init__(self, args: ArgParser, resume: bool = False, dry_run: bool = False):
         file_path: str = args.config_path
-        name: str = os.path.basename(file_path).split('.')[0]
-        dir: str = os.path.dirname(file_path)
+        self.name: str = os.path.basename(file_path).split('.')[0]
+        self.dir: str = os.path.dirname(file_path)
+        self.args: ArgParser = args
 
         config: Dict[str, Any] = self.load_config(file_path)
         defaults: Dict[str, Any] = config['default_settings'] if 'default_settings' in config else None
 
-        log(f'Parsing {name}...')
+        log(f'Parsing {self.name}...')
         self.behaviors: List[Behavior] = []
         self.stop_conditions: List[StopCondition] = []
 
         for k, v in config['behaviors'].items():
-            b: Behavior = Behavior(k, args.run_id, v, defaults)
+            b: Behavior = Behavior(k, v, defaults)
             self.behaviors.append(b)
             # Stop conditions are global in the sense that if they are set for
             # only one of multiple behaviors, the corresponding training run will
@@ -423,71 +1304,260 @@ class Config():
                 if cond not in self.stop_conditions:
                     self.stop_conditions.append(cond)
 
-        # Create all possible run ID combinations
-        # Outer list: by combo, inner list: verbose run ids
-        self.verbose_run_id_combos: List[List[str]] = self.get_run_id_combinations()
-        self.num_runs: int = len(self.verbose_run_id_combos)
-
-        # Gather config settings for each run id combination
-        # Outer list: by combo, inner list: by run id, dict: config settings
-        run_configs: List[List[Dict[str, Any]]] = []
-
-        config_names: List[str] = []
-        config_info: List[str] = []
-
-        for i, run_id_combo in enumerate(self.verbose_run_id_combos):
-            config_name: str = name + '-' + str(i)
-            config_names.append(config_name)
-            # Configs by run id
-            configs: List[Dict[str, Any]] = []
-            for run_id in run_id_combo:
-                # Find matching behavior
-                for behavior in self.behaviors:
-                    if run_id in behavior.verbose_run_ids:
-                        b: int = behavior.verbose_run_ids.index(run_id)
-                        configs.append(behavior.mod_configs[b])
-                        config_info.extend(behavior.value_infos[b])
-                        break
-            run_configs.append(configs)
-
-        n: int = len(run_configs)
-        assert n is self.num_runs, f'Wrong number of configs {n}, should be {self.num_runs}'
-        self.save_info(config_info, dir)
-
-        # Build and save combined config settings
-        self.config_paths: List[str] = []
-        for i in range(self.num_runs):
-            save_config: Dict[str, Any] = {'behaviors': {}}
-            for j, b in enumerate(self.behaviors):
-                save_config['behaviors'][b.name] = run_configs[i][j]
-            file_path: str = self.save_config(save_config, dir, config_names[i])
-            self.config_paths.append(file_path)
-
-        log(f'{self.num_runs} training runs queued. See config_info.txt for details.')
-
-    """
-    Generates run id combinations.
-
-    :param List[List[str]] result: run id combination list
-    :param List[str] tmp: temp. run id list
-    :param int i: behavior index
-    :return: list of all run id combinations
-    :rytpe: List[List[str]]
-    """
-
-    def get_run_id_combinations(self, result: List[List[str]] = None, tmp: List[str] = None, i: int = 0) -> List[
-        List[str]]:
-        n: int = len(self.behaviors)
-        result: List[List[str]] = [] if result is None else result
-        tmp: List[str] = [None] * n if tmp is None else tmp
-        for id in self.behaviors[i].verbose_run_ids:
-            tmp[i] = id  # Current run id by behavior index
-            if i is n - 1:
-                result.append(tmp.copy())
+        # Whether behaviors share the same combo index / sample point
+        # instead of every combination being combined with every other one
+        self.zip_behaviors: bool = args.zip_behaviors
+
+        # Random/quasi-random sampling is used if specified, or if there are
+        # any ranges. In that case, max_runs sample points are drawn from
+        # the unit hypercube spanned by all value option axes of all behaviors.
+        self.sampler: Sampler = None
+        # TPE search always samples, model based points replace random ones.
+        # PBT samples its initial population, perturbed points are added later.
+        if args.sampler or args.scheduler in ('tpe', 'pbt') or any(b.has_ranges for b in self.behaviors):
+            if args.scheduler == 'pbt':
+                self.num_runs: int = args.population
+            elif args.max_runs < 1:
+                raise ValueError('Sampling requires a --max-runs budget.')
+            else:
+                self.num_runs: int = args.max_runs
+            if self.zip_behaviors:
+                num_dims: int = max(len(b.axes) for b in self.behaviors)
             else:
-                self.get_run_id_combinations(result, tmp, i + 1)
+                num_dims: int = sum(len(b.axes) for b in self.behaviors)
+            method: str = args.sampler if args.sampler else ('random' if args.scheduler == 'tpe' else 'lhs')
+            if not dry_run:
+                self.sampler = Sampler(method, self.num_runs, num_dims, args.sampler_seed)
+            log(f'Sampling {self.num_runs} runs ({method}, {num_dims} dimensions).')
+        else:
+            # Every behavior combination is combined with every other behavior
+            # combination, the run count is the product of their combo counts.
+            # Zipped behaviors share combo indices, the run count is the
+            # highest combo count. Run configs are generated lazily, when a
+            # run is started.
+            self.num_runs: int = 1
+            for b in self.behaviors:
+                if self.zip_behaviors:
+                    self.num_runs = max(self.num_runs, b.num_combos)
+                else:
+                    self.num_runs *= b.num_combos
+            if args.max_runs > 0:
+                self.num_runs = min(self.num_runs, args.max_runs)
+
+        # Base settings are saved once, run overrides are appended as runs start
+        self.manifest: Manifest = None
+        # Run configs are rendered to temporary files for the trainers
+        self.temp_dir: str = None
+        if not dry_run:
+            self.manifest = Manifest(self.dir, {b.name: b.parsed for b in self.behaviors}, resume)
+            log(f'{self.num_runs} training runs queued. See {self.manifest.path} for details.')
+
+    """
+    Returns the behavior value combination indices for a specified run.
+    Runs are ordered like a nested loop over all behaviors,
+    with the last behavior changing fastest.
+    Zipped behaviors cycle through their combinations in parallel.
+
+    :param int n: run count
+    :return: value combination index by behavior index
+    :rtype: List[int]
+    """
+
+    def get_combo_indices(self, n: int) -> List[int]:
+        if self.zip_behaviors:
+            return [n % b.num_combos for b in self.behaviors]
+        result: List[int] = [0] * len(self.behaviors)
+        for j in range(len(self.behaviors) - 1, -1, -1):
+            n, result[j] = divmod(n, self.behaviors[j].num_combos)
         return result
 
+    """
+    Returns the option values for a specified run.
+
+    :param int n: run count
+    :return: value combination by behavior index
+    :rtype: List[List[Any]]
+    """
+
+    def get_values(self, n: int) -> List[List[Any]]:
+        if self.sampler:
+            point: List[float] = self.sampler.get_point(n)
+            if self.zip_behaviors:
+                return [b.get_sampled_values(point) for b in self.behaviors]
+            result: List[List[Any]] = []
+            for b in self.behaviors:
+                result.append(b.get_sampled_values(point[:len(b.axes)]))
+                point = point[len(b.axes):]
+            return result
+        return [b.get_value_combination(i) for b, i in zip(self.behaviors, self.get_combo_indices(n))]
+
+    """
+    Returns the number of values of each sample point dimension,
+    0 for continuous ranges. With zipped behaviors, a dimension's
+    size is taken from the first behavior that has the axis.
+
+    :return: number of values by dimension
+    :rtype: List[int]
+    """
+
+    def get_axis_sizes(self) -> List[int]:
+        options: List[Union[ValueOption, RangeOption]] = []
+        if self.zip_behaviors:
+            for d in range(max(len(b.axes) for b in self.behaviors)):
+                b: Behavior = next(b for b in self.behaviors if len(b.axes) > d)
+                options.append(b.value_options[b.axes[d][0]])
+        else:
+            for b in self.behaviors:
+                options.extend(b.value_options[axis[0]] for axis in b.axes)
+        return [len(x.values) if isinstance(x, ValueOption) else 0 for x in options]
+
+    """
+    Returns verbose run IDs for a specified run.
+    Verbose run IDs contain behavior names: RunID-#/BehaviorName
+    that's how they are listed in TensorBoard.
+
+    :param int n: run count
+    :return: verbose run ID by behavior index
+    :rtype: List[str]
+    """
+
+    def get_verbose_run_ids(self, n: int) -> List[str]:
+        run_id: str = self.args.get_run_id(n)
+        return [os.path.join(run_id, b.name) for b in self.behaviors]
+
+    """
+    Builds config settings for a specified run.
+
+    :param int n: run count
+    :param int max_steps: overrides max_steps for all behaviors if set
+    :return: config settings
+    :rtype: Dict[str, Any]
+    """
+
+    def get_run_config(self, n: int, max_steps: int = None) -> Dict[str, Any]:
+        run_config: Dict[str, Any] = {'behaviors': {}}
+        for b, values in zip(self.behaviors, self.get_values(n)):
+            run_config['behaviors'][b.name] = b.get_mod_config(values)
+            if max_steps is not None:
+                run_config['behaviors'][b.name]['max_steps'] = max_steps
+        return run_config
+
+    """
+    Returns a content hash for run config settings.
+    Combines the behaviors' config hashes with the arguments
+    passed on to mlagents-learn, e.g. the environment path.
+
+    :param Dict[str, Any] run_config: run config settings
+    :return: config hash
+    :rtype: str
+    """
+
+    def get_config_hash(self, run_config: Dict[str, Any]) -> str:
+        hashes: Dict[str, str] = {}
+        for b in self.behaviors:
+            hashes[b.name] = b.get_config_hash(run_config['behaviors'][b.name])
+        content: str = json.dumps([hashes, sorted(self.args.env_args)], sort_keys=True)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    """
+    Records a run's option values in the manifest and renders
+    its config settings to a temporary yaml file for the trainer.
+
+    :param int n: run count
+    :param Dict[str, Any] run_config: run config settings
+    :param int max_steps: overrides max_steps for all behaviors if set
+    :param str config_hash: the run's config hash
+    :return: path to config file
+    :rtype: str
+    """
+
+    def save_run_config(self, n: int, run_config: Dict[str, Any], max_steps: int = None,
+                        config_hash: str = None) -> str:
+        self.manifest.add(n, {'run_id': self.args.get_run_id(n), 'hash': config_hash, 'max_steps': max_steps,
+                              'overrides': self.get_run_overrides(n)})
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix=self.name + '-')
+        return self.save_config(run_config, self.temp_dir, self.args.get_run_id(n))
+
+    """
+    Returns a run's option values as key path overrides by behavior name.
+
+    :param int n: run count
+    :return: key path overrides by behavior name
+    :rtype: Dict[str, List[List[Any]]]
+    """
+
+    def get_run_overrides(self, n: int) -> Dict[str, List[List[Any]]]:
+        overrides: Dict[str, List[List[Any]]] = {}
+        for b, values in zip(self.behaviors, self.get_values(n)):
+            overrides[b.name] = b.get_value_overrides(values)
+        return overrides
+
+    """
+    Deletes the temporary config file of a run.
+
+    :param int n: run count
+    :rtype: None
+    """
+
+    def remove_run_config(self, n: int) -> None:
+        try:
+            os.remove(os.path.join(self.temp_dir, self.args.get_run_id(n) + '.yaml'))
+        except (OSError, TypeError):
+            pass
+
+    """
+    Deletes the directory of temporary config files.
+
+    :rtype: None
+    """
+
+    def remove_temp_dir(self) -> None:
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+    """
+    Returns the priority of a run, the sum of its behaviors' value priorities.
+
+    :param int n: run count
+    :return: priority
+    :rtype: float
+    """
+
+    def get_priority(self, n: int) -> float:
+        return sum(b.get_priority(values) for b, values in zip(self.behaviors, self.get_values(n)))
+
+    """
+    Returns the highest max_steps value of a run's behaviors.
+
+    :param int n: run count
+    :return: number of training steps
+    :rtype: int
+    """
+
+    def get_run_steps(self, n: int) -> int:
+        return max(int(b.get_mod_config(values).get('max_steps', Behavior.default_max_steps))
+                   for b, values in zip(self.behaviors, self.get_values(n)))
+
+    """
+    Returns the highest max_steps value of all behaviors and runs. If max_steps
+    is a value option, its highest value is used, if it's a range, its upper limit.
+
+    :return: max. number of training steps
+    :rtype: int
+    """
+
+    def get_max_steps(self) -> int:
+        result: List[int] = []
+        for b in self.behaviors:
+            option: Union[ValueOption, RangeOption] = b.get_max_steps_option()
+            if option is None:
+                result.append(int(b.parsed.get('max_steps', Behavior.default_max_steps)))
+            else:
+                result.append(int(option.high if isinstance(option, RangeOption) else max(option.values)))
+        return max(result)
+
     """
     Loads config settings from yaml file.
 
@@ -526,197 +1596,3323 @@ class Config():
         except FileNotFoundError:
             log(f'Could not save configuration to {path}.')
 
-    """
-    Saves config info to text file.
-
-    :param List[str] info: lines of output text
-    :param str dir: file directory
-    :rytpe: None
-    """
-
-    def save_info(self, info: List[str], dir: str) -> None:
-        path: str = os.path.join(dir, "config_info.txt")
-        try:
-            with open(path, "w") as f:
-                for line in info:
-                    f.write(line)
-        except FileNotFoundError:
-            log(f'Could not save configuration info to {path}.')
-
     def __str__(self):
         return self.name
 
 
 """
-Handles training runs.
+Compact record of a sweep's run configs, saved next to the source config.
+manifest.jsonl holds the base settings of all behaviors once, followed by one
+line per started (or cached) run with its option values as key path overrides.
+manifest.idx holds a fixed-size byte offset per run count, pointing to the
+run's latest line, so any run's record can be read without scanning the file.
 """
 
 
-class Runner():
+class Manifest():
+    # Index entries are unsigned 64 bit offsets, 0 if a run has no record
+    entry = struct.Struct('<Q')
+
     """
-    :param ArgParser args: ArgParser instance
+    :param str dir: directory of the source config
+    :param Dict[str, Dict[str, Any]] base: base settings by behavior name,
+        reads them from an existing manifest if None
+    :param bool resume: whether an interrupted sweep is resumed, appends to its manifest
     """
 
-    def __init__(self, args: ArgParser):
-        self.args: ArgParser = args
-        self.config: Config = Config(args)
-        # Each slot can store a subprocess
-        num_slots: int = args.num_envs
-        self.slots: List[subprocess.Popen] = [None] * num_slots
-        # Short run IDs don't contain behavior names, these
-        # are the IDs passed as arguments to the subprocesses
-        self.short_run_ids: List[str] = [None] * num_slots
-        # Need to store verbose run IDs for the subprocesses too,
-        # in order to evaluate stop conditions for each behavior
-        self.verbose_run_ids: List[List[str]] = [None] * num_slots
-        self.run_count: int = 0
-        self.run_controller()
+    def __init__(self, dir: str, base: Dict[str, Dict[str, Any]] = None, resume: bool = False):
+        self.path: str = os.path.join(dir, 'manifest.jsonl')
+        self.index_path: str = os.path.join(dir, 'manifest.idx')
+        self.base: Dict[str, Dict[str, Any]] = base
+        if base is None:
+            with open(self.path) as f:
+                self.base = json.loads(f.readline())['base']
+        elif not resume or not os.path.isfile(self.path):
+            try:
+                with open(self.path, 'w') as f:
+                    f.write(json.dumps({'base': base}, default=str) + '\n')
+                open(self.index_path, 'wb').close()
+            except OSError:
+                log(f'Could not write to {self.path}.')
 
     """
-    Starts training runs and checks for stop conditions.
+    Appends a run record and points the run's index entry to it.
 
-    :param int interval: state check interval
-    :rytpe: None
+    :param int n: run count
+    :param Dict[str, Any] record: run id, overrides and other run info
+    :rtype: None
     """
 
-    def run_controller(self, interval: int = 60) -> None:
-        interrupt: bool = False
+    def add(self, n: int, record: Dict[str, Any]) -> None:
+        try:
+            with open(self.path, 'a') as f:
+                offset: int = f.tell()
+                f.write(json.dumps(dict(run=n, **record), default=str) + '\n')
+            # Writing beyond the end of the index pads it with zeros
+            with open(self.index_path, 'r+b') as f:
+                f.seek(n * Manifest.entry.size)
+                f.write(Manifest.entry.pack(offset))
+        except OSError:
+            log(f'Could not write to {self.path}.')
 
-        while self.has_active_runs() or self.has_pending_runs():
-            while True:
-                i: int = self.get_free_slot()
-                if i > -1 and self.has_pending_runs():
-                    self.start_process(i)
-                else:
-                    break
-            try:
-                while True:
-                    time.sleep(interval)
-                    exit: bool = False
-                    done: List[int] = []
-                    for i, slot in enumerate(self.slots):
-                        if slot:
-                            id: str = self.short_run_ids[i]
-                            log(f'Checking {id} progress...')
-                            if slot.poll() is not None:
-                                done.append(i)
-                            elif self.must_stop(i):
-                                self.stop_process(i)
-                                exit = True
-
-                    for i in done:
-                        id: str = self.short_run_ids[i]
-                        code: int = self.slots[i].returncode
-                        if code is 0:
-                            log(f'{id} complete.')
-                        else:
-                            log(f'An error occurred in {id}: {code}.')
-                        self.slots[i].kill()  # TODO do we need this?
-                        self.slots[i] = None
-                        exit = True
-
-                    if exit:
-                        break
+    """
+    Returns the latest record of a run.
 
-            except KeyboardInterrupt:
-                interrupt = True
-                for i, slot in enumerate(self.slots):
-                    if slot:
-                        self.stop_process(i)
-                break
+    :param int n: run count
+    :return: record, None if the run has no record
+    :rtype: Dict[str, Any]
+    """
 
-        if interrupt:
-            log('Training was interrupted.')
-        else:
-            log('All training runs complete.')
+    def get(self, n: int) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, 'rb') as f:
+                f.seek(n * Manifest.entry.size)
+                data: bytes = f.read(Manifest.entry.size)
+            if len(data) < Manifest.entry.size:
+                return None
+            offset: int = Manifest.entry.unpack(data)[0]
+            if offset == 0:
+                return None
+            with open(self.path) as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
 
     """
-    Starts a training run / launches a subprocess.
+    Returns the latest record of each run.
 
-    :param int i: slot index where the process will be stored
-    :rytpe: None
+    :return: records by run count, in run order
+    :rtype: Dict[int, Dict[str, Any]]
     """
 
-    def start_process(self, i: int) -> None:
-        n: int = self.run_count
-        self.run_count += 1
+    def get_all(self) -> Dict[int, Dict[str, Any]]:
+        records: Dict[int, Dict[str, Any]] = {}
+        try:
+            with open(self.path) as f:
+                f.readline()  # Base settings
+                for line in f:
+                    try:
+                        record: Dict[str, Any] = json.loads(line)
+                    except ValueError:
+                        continue  # Incomplete line written during a crash
+                    records[record['run']] = record
+        except OSError:
+            log(f'Could not read {self.path}.')
+        return dict(sorted(records.items()))
 
-        args: List[str] = self.args.get_process_args(n, i, self.config.config_paths[n])
-        if platform.system() == 'Windows':
-            self.slots[i] = subprocess.Popen(args, creationflags=subprocess.CREATE_NEW_CONSOLE)
-        elif platform.system() == 'Linux':
-            self.slots[i] = subprocess.Popen('gnome-terminal -x ' + ' '.join(args), shell=True)
+    """
+    Rebuilds the config settings of a run from its record.
 
-        run_id: str = self.args.get_run_id(n)
-        self.short_run_ids[i] = run_id
-        self.verbose_run_ids[i] = self.config.verbose_run_id_combos[n]
-        log(f'{run_id} started.')
+    :param int n: run count
+    :return: config settings, None if the run has no record
+    :rtype: Dict[str, Any]
+    """
 
+    def get_run_config(self, n: int) -> Dict[str, Any]:
+        record: Dict[str, Any] = self.get(n)
+        if record is None or 'overrides' not in record:
+            return None
+        run_config: Dict[str, Any] = {'behaviors': {}}
+        for name, settings in self.base.items():
+            settings = json.loads(json.dumps(settings))
+            for path, value in record['overrides'].get(name, []):
+                node: Dict[str, Any] = settings
+                for k in path[:-1]:
+                    node = node[k]
+                node[path[-1]] = value
+            if record.get('max_steps') is not None:
+                settings['max_steps'] = record['max_steps']
+            run_config['behaviors'][name] = settings
+        return run_config
+
+
+"""
+Append-only JSONL ledger of run states, saved next to the source config.
+The first line identifies the sweep by a hash of the config file and
+the args that affect which runs are generated. If the ledger matches
+the current sweep, its records are used to resume the sweep.
+"""
+
+
+class Ledger():
+    """
+    :param ArgParser args: ArgParser instance
     """
-    Stops specified process.
 
-    :param int i: process slot index
+    def __init__(self, args: ArgParser):
+        self.path: str = os.path.join(os.path.dirname(args.config_path), 'ledger.jsonl')
+        self.sweep: str = self.get_sweep_hash(args)
+        # All records of the current sweep in order
+        self.records: List[Dict[str, Any]] = self.load()
+        self.resumed: bool = len(self.records) > 0
+        if self.resumed:
+            log(f'Resuming sweep from {self.path}.')
+        else:
+            self.write({'sweep': self.sweep}, 'w')
+
     """
+    Returns a hash identifying the sweep.
 
-    def stop_process(self, i: int):
-        # Windows only
-        self.slots[i].terminate()
-        self.slots[i] = None
+    :param ArgParser args: ArgParser instance
+    :return: sweep hash
+    :rtype: str
+    """
+
+    def get_sweep_hash(self, args: ArgParser) -> str:
+        h = hashlib.sha1()
+        with open(args.config_path, 'rb') as f:
+            h.update(f.read())
+        keys: List[Any] = [args.run_id, args.scheduler, args.sampler, args.sampler_seed, args.max_runs,
+                           args.min_steps, args.eta, args.rank_tag, args.tpe_startup, args.zip_behaviors]
+        # The population defaults to num-envs, which may change when a sweep is resumed
+        if args.scheduler == 'pbt':
+            keys.extend([args.population, args.pbt_interval])
+        if args.order != 'grid':
+            keys.append(args.order)
+        h.update(json.dumps(keys).encode('utf-8'))
+        return h.hexdigest()
 
     """
-    Whether any stop condition was met for a specified process.
+    Loads the records of the current sweep.
 
-    :param int i: process slot index
-    :return: true if process must stop.
-    :rytpe: bool
+    :return: records, empty if there is no ledger for the current sweep
+    :rtype: List[Dict[str, Any]]
     """
 
-    def must_stop(self, i: int) -> bool:
-        for cond in self.config.stop_conditions:
-            for id in self.verbose_run_ids[i]:
-                stop, reason = cond.evaluate(id)
-                if stop:
-                    log(f'Stopping {self.short_run_ids[i]} because {reason}')
-                    return True
-        return False
+    def load(self) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass  # Incomplete line written during a crash
+        except FileNotFoundError:
+            return []
+        if not records or records[0].get('sweep') != self.sweep:
+            return []
+        return records[1:]
 
     """
-    Whether there are any pending runs.
+    Appends a run record.
 
-    :return: true if there are any pending runs
-    :rytpe: bool
+    :param int n: run count
+    :param str state: 'queued', 'started', 'complete', 'failed' or 'stopped'
+    :param Any info: additional record fields
+    :rtype: None
     """
 
-    def has_pending_runs(self) -> bool:
-        return self.run_count < self.config.num_runs
+    def record(self, n: int, state: str, **info: Any) -> None:
+        entry: Dict[str, Any] = {'run': n, 'state': state, 'time': round(time.time(), 3)}
+        entry.update(info)
+        self.records.append(entry)
+        self.write(entry, 'a')
 
     """
-    Whether there are any active runs.
+    Returns the latest record for each run.
 
-    :return: true if there are any active runs
-    :rytpe: bool
+    :return: records by run count
+    :rtype: Dict[int, Dict[str, Any]]
     """
 
-    def has_active_runs(self) -> bool:
-        for slot in self.slots:
-            if slot is not None:
-                return True
-        return False
+    def get_states(self) -> Dict[int, Dict[str, Any]]:
+        return {r['run']: r for r in self.records}
 
     """
-    Returns next available process slot index or -1.
+    Writes a line to the ledger file and syncs it to disk.
 
-    :return: next available process slot index or -1
-    :rytpe: int
+    :param Dict[str, Any] entry: JSON line content
+    :param str mode: file mode, 'w' to overwrite or 'a' to append
+    :rtype: None
     """
 
-    def get_free_slot(self) -> int:
-        for i, slot in enumerate(self.slots):
-            if slot is None:
+    def write(self, entry: Dict[str, Any], mode: str) -> None:
+        try:
+            with open(self.path, mode) as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            log(f'Could not write to {self.path}.')
+
+
+"""
+Content addressed cache of completed runs, shared across sweeps.
+Maps config hashes to results directories and final metrics.
+Stored as an append-only JSONL file.
+"""
+
+
+class ResultCache():
+    """
+    :param str path: cache file path
+    :param str results_dir: mlagents-learn results directory
+    """
+
+    def __init__(self, path: str, results_dir: str):
+        self.path: str = path
+        self.results_dir: str = results_dir
+        # Cache entries by config hash
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry: Dict[str, Any] = json.loads(line)
+                        self.entries[entry['hash']] = entry
+                    except (ValueError, KeyError):
+                        pass
+        except FileNotFoundError:
+            pass
+        if self.entries:
+            log(f'Found {len(self.entries)} cached runs in {path}.')
+
+    """
+    Returns the cache entry for a config hash if its results still exist.
+
+    :param str config_hash: config hash
+    :return: cache entry or None
+    :rtype: Dict[str, Any]
+    """
+
+    def lookup(self, config_hash: str) -> Dict[str, Any]:
+        entry: Dict[str, Any] = self.entries.get(config_hash)
+        if entry and os.path.isdir(entry['path']):
+            return entry
+        return None
+
+    """
+    Adds a completed run to the cache.
+
+    :param str config_hash: config hash
+    :param str run_id: run id
+    :param float value: final rank tag value
+    :param Dict[str, float] metrics: final metrics by tag
+    :rtype: None
+    """
+
+    def add(self, config_hash: str, run_id: str, value: float, metrics: Dict[str, float]) -> None:
+        entry: Dict[str, Any] = {'hash': config_hash, 'run_id': run_id,
+                                 'path': os.path.abspath(os.path.join(self.results_dir, run_id)),
+                                 'value': value, 'metrics': metrics}
+        self.entries[config_hash] = entry
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError:
+            log(f'Could not write to {self.path}.')
+
+
+"""
+Records timings of the runs and slots of a sweep: queue wait, launch latency,
+wall time, steps/sec, slot idle time and stop check latency. Finished runs are
+appended to run_stats.jsonl, totals are exported to run_stats.prom in the
+Prometheus text format (for node_exporter's textfile collector).
+"""
+
+
+class RunStats():
+    """
+    :param ArgParser args: ArgParser instance
+    :param int num_slots: number of slots
+    :param bool resumed: whether an interrupted sweep is resumed, appends to its stats
+    """
+
+    def __init__(self, args: ArgParser, num_slots: int, resumed: bool = False):
+        dir: str = os.path.dirname(args.config_path)
+        self.path: str = os.path.join(dir, 'run_stats.jsonl')
+        self.prom_path: str = os.path.join(dir, 'run_stats.prom')
+        # Throughput of past sweeps, for estimating the wall time of new ones
+        self.history_path: str = os.path.join(dir, 'run_stats_history.jsonl')
+        self.name: str = os.path.basename(args.config_path).split('.')[0]
+        if not resumed and os.path.isfile(self.path):
+            os.remove(self.path)
+        self.start_time: float = time.time()
+        self.num_slots: int = num_slots
+        # Time each slot became free
+        self.free_since: List[float] = [self.start_time] * num_slots
+        # Accumulated idle and busy seconds by slot
+        self.idle: List[float] = [0.0] * num_slots
+        self.busy: List[float] = [0.0] * num_slots
+        # Stats of the active runs by slot
+        self.active: List[Dict[str, Any]] = [None] * num_slots
+        # Finished runs by state
+        self.runs: Dict[str, int] = {}
+        # Sums over all finished runs
+        self.totals: Dict[str, float] = {'queue_wait': 0.0, 'launch_latency': 0.0, 'wall_time': 0.0, 'steps': 0}
+        # Number, sum and max. of stop check durations
+        self.checks: int = 0
+        self.check_time: float = 0.0
+        self.check_max: float = 0.0
+
+    """
+    Called when a run was started in a slot.
+
+    :param int i: slot index
+    :param int n: run count
+    :param str run_id: run id
+    :param float queued: time the job was queued, None if it was runnable from the start of the sweep
+    :param float launched: time the runner began launching the run
+    :rytpe: None
+    """
+
+    def on_start(self, i: int, n: int, run_id: str, queued: float, launched: float) -> None:
+        now: float = time.time()
+        gap: float = launched - self.free_since[i]
+        self.idle[i] += gap
+        self.active[i] = {'run': n, 'run_id': run_id, 'slot': i, 'start': now, 'idle_before': round(gap, 3),
+                          'queue_wait': round(launched - max(queued or 0, self.start_time), 3),
+                          'launch_latency': round(now - launched, 3)}
+
+    """
+    Called when a run has exited or was stopped.
+
+    :param int i: slot index
+    :param str state: 'complete', 'failed' or 'stopped'
+    :param int steps: steps trained by the run, None if unknown
+    :rytpe: None
+    """
+
+    def on_finish(self, i: int, state: str, steps: int) -> None:
+        now: float = time.time()
+        entry: Dict[str, Any] = self.active[i]
+        self.active[i] = None
+        start: float = entry.pop('start')
+        wall_time: float = now - start
+        self.busy[i] += wall_time
+        self.free_since[i] = now
+
+        entry['state'] = state
+        entry['wall_time'] = round(wall_time, 3)
+        entry['steps'] = steps
+        entry['steps_per_sec'] = round(steps / wall_time, 3) if steps and wall_time > 0 else None
+        self.runs[state] = self.runs.get(state, 0) + 1
+        self.totals['queue_wait'] += entry['queue_wait']
+        self.totals['launch_latency'] += entry['launch_latency']
+        self.totals['wall_time'] += wall_time
+        self.totals['steps'] += steps or 0
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError:
+            log(f'Could not write to {self.path}.')
+        self.export()
+
+    """
+    Called after each stop check.
+
+    :param float duration: seconds spent fetching scalars and evaluating stop conditions
+    :rytpe: None
+    """
+
+    def on_check(self, duration: float) -> None:
+        self.checks += 1
+        self.check_time += duration
+        self.check_max = max(self.check_max, duration)
+
+    """
+    Returns accumulated idle and busy seconds of all slots up to now,
+    including active runs and currently free slots.
+
+    :return: idle seconds, busy seconds
+    :rytpe: Tuple[float, float]
+    """
+
+    def get_slot_times(self) -> Tuple[float, float]:
+        now: float = time.time()
+        idle: float = sum(self.idle)
+        busy: float = sum(self.busy)
+        for i, entry in enumerate(self.active):
+            if entry:
+                busy += now - entry['start']
+            else:
+                idle += now - self.free_since[i]
+        return idle, busy
+
+    """
+    Writes the totals to the Prometheus text file.
+    The file is replaced atomically, so scrapers never read a partial file.
+
+    :rytpe: None
+    """
+
+    def export(self) -> None:
+        idle, busy = self.get_slot_times()
+        count: int = sum(self.runs.values())
+        lines: List[str] = [
+            '# HELP mlagents_sweep_runs_total Finished runs by state.',
+            '# TYPE mlagents_sweep_runs_total counter']
+        lines.extend(f'mlagents_sweep_runs_total{{state="{state}"}} {num}' for state, num in self.runs.items())
+        metrics: List[Tuple[str, str, str, float]] = [
+            ('slots', 'gauge', 'Number of slots.', self.num_slots),
+            ('active_slots', 'gauge', 'Number of slots running a training run.',
+             sum(1 for entry in self.active if entry)),
+            ('slot_busy_seconds_total', 'counter', 'Seconds slots spent running training runs.', busy),
+            ('slot_idle_seconds_total', 'counter', 'Seconds slots spent idle.', idle),
+            ('queue_wait_seconds_sum', 'counter', 'Seconds finished runs waited for a slot.',
+             self.totals['queue_wait']),
+            ('launch_latency_seconds_sum', 'counter', 'Seconds spent launching finished runs.',
+             self.totals['launch_latency']),
+            ('run_wall_seconds_sum', 'counter', 'Wall time of finished runs.', self.totals['wall_time']),
+            ('run_count', 'counter', 'Number of finished runs.', count),
+            ('steps_total', 'counter', 'Steps trained by finished runs.', self.totals['steps']),
+            ('stop_check_seconds_sum', 'counter', 'Seconds spent on stop checks.', self.check_time),
+            ('stop_check_count', 'counter', 'Number of stop checks.', self.checks),
+            ('stop_check_seconds_max', 'gauge', 'Longest stop check.', self.check_max)]
+        for name, kind, text, value in metrics:
+            lines.append(f'# HELP mlagents_sweep_{name} {text}')
+            lines.append(f'# TYPE mlagents_sweep_{name} {kind}')
+            lines.append(f'mlagents_sweep_{name} {round(value, 3)}')
+        try:
+            with open(self.prom_path + '.tmp', 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(self.prom_path + '.tmp', self.prom_path)
+        except OSError:
+            log(f'Could not write to {self.prom_path}.')
+
+    """
+    Returns the steps/sec per slot of this sweep's finished runs, or of earlier
+    sweeps if no run has finished yet, preferring sweeps of the same config.
+
+    :return: steps/sec per slot, None if there is no data
+    :rytpe: float
+    """
+
+    def get_throughput(self) -> float:
+        if self.totals['steps'] and self.totals['wall_time'] > 0:
+            return self.totals['steps'] / self.totals['wall_time']
+        return RunStats.load_throughput(self.history_path, self.name)[0]
+
+    """
+    Returns the steps/sec per slot of the runs or sweeps recorded in
+    run_stats.jsonl or run_stats_history.jsonl.
+
+    :param str path: file path
+    :param str name: config name, records of this config are preferred if any
+    :return: steps/sec per slot, None if there is no data
+    :return: number of records the throughput was measured from
+    :return: whether the records are of the specified config
+    :rytpe: Tuple[float, int, bool]
+    """
+
+    @staticmethod
+    def load_throughput(path: str, name: str = None) -> Tuple[float, int, bool]:
+        records: List[Dict[str, Any]] = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except OSError:
+            pass
+        records = [r for r in records if r.get('steps') and r.get('wall_time')]
+        same: List[Dict[str, Any]] = [r for r in records if name is not None and r.get('config') == name]
+        records = same or records
+        if not records:
+            return None, 0, False
+        return sum(r['steps'] for r in records) / sum(r['wall_time'] for r in records), len(records), len(same) > 0
+
+    """
+    Logs a utilization summary of the sweep.
+
+    :rytpe: None
+    """
+
+    def log_summary(self) -> None:
+        self.export()
+        idle, busy = self.get_slot_times()
+        count: int = sum(self.runs.values())
+        elapsed: float = time.time() - self.start_time
+        log(f'Sweep took {elapsed / 3600:.2f} h, {count} runs finished '
+            f'({", ".join(f"{num} {state}" for state, num in self.runs.items()) or "none"}).')
+        if idle + busy > 0:
+            log(f'Slot utilization: {100 * busy / (idle + busy):.1f}% '
+                f'({busy / 3600:.2f} slot-hours busy, {idle / 3600:.2f} idle).')
+        if count:
+            log(f'Mean queue wait: {self.totals["queue_wait"] / count:.1f} s, '
+                f'mean launch latency: {self.totals["launch_latency"] / count:.2f} s, '
+                f'mean run wall time: {self.totals["wall_time"] / count:.1f} s.')
+        if self.totals['steps'] and elapsed > 0:
+            log(f'Throughput: {self.totals["steps"] / elapsed:.1f} steps/sec.')
+        if self.checks:
+            log(f'Stop checks: {self.checks}, mean latency {self.check_time / self.checks:.3f} s, '
+                f'max. {self.check_max:.3f} s.')
+        if self.totals['steps'] and self.totals['wall_time'] > 0:
+            entry: Dict[str, Any] = {'config': self.name, 'time': round(time.time(), 3), 'slots': self.num_slots,
+                                     'runs': count, 'steps': self.totals['steps'],
+                                     'wall_time': round(self.totals['wall_time'], 3), 'elapsed': round(elapsed, 3)}
+            try:
+                with open(self.history_path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+            except OSError:
+                log(f'Could not write to {self.history_path}.')
+
+
+"""
+Reads available CPUs, CPU utilization and memory from /proc (Linux),
+assigns disjoint CPU sets to slots and decides whether new runs can be
+started without overloading the machine.
+"""
+
+
+class Resources():
+    """
+    :param ArgParser args: ArgParser instance
+    """
+
+    def __init__(self, args: ArgParser):
+        self.max_load: float = args.max_load
+        self.min_free_mem: int = args.min_free_mem
+        self.admit_delay: int = args.admit_delay
+        self.last_admit: float = 0
+        # Previous (busy, total) CPU times for measuring utilization
+        self.cpu_times: Tuple[int, int] = self.read_cpu_times()
+        # Last reason for deferring a run start
+        self.reason: str = None
+
+        self.cpu_sets: List[List[int]] = [None] * args.num_envs
+        if args.pin_cpus:
+            if hasattr(os, 'sched_getaffinity'):
+                self.cpu_sets = self.get_cpu_sets(sorted(os.sched_getaffinity(0)), args.num_envs)
+                for i, cpus in enumerate(self.cpu_sets):
+                    log(f'Slot {i}: CPUs {",".join(map(str, cpus))}')
+            else:
+                log('CPU pinning is not supported on this platform.')
+
+    """
+    Splits CPUs into disjoint sets, one per slot.
+    Slots share CPUs if there are more slots than CPUs.
+
+    :param List[int] cpus: available CPUs
+    :param int num_slots: number of slots
+    :return: CPUs by slot index
+    :rtype: List[List[int]]
+    """
+
+    def get_cpu_sets(self, cpus: List[int], num_slots: int) -> List[List[int]]:
+        size: int = max(len(cpus) // num_slots, 1)
+        result: List[List[int]] = []
+        for i in range(num_slots):
+            start: int = (i * size) % len(cpus)
+            result.append(cpus[start:start + size])
+        return result
+
+    """
+    Whether a new run can be started.
+    If no runs are active, a run is always started.
+
+    :param bool active: whether any runs are active
+    :return: true if resource limits allow starting a run
+    :rtype: bool
+    """
+
+    def can_admit(self, active: bool) -> bool:
+        if not active or (self.max_load <= 0 and self.min_free_mem <= 0):
+            return True
+        if time.time() - self.last_admit < self.admit_delay:
+            return False
+
+        reason: str = None
+        load: float = self.get_load()
+        mem: int = self.get_free_memory()
+        if self.max_load > 0 and load is not None and load > self.max_load:
+            reason = f'CPU load {load:.2f} > {self.max_load}'
+        elif self.min_free_mem > 0 and mem is not None and mem < self.min_free_mem:
+            reason = f'free memory {mem} MB < {self.min_free_mem} MB'
+        if reason and not self.reason:
+            log(f'Waiting for resources, {reason}.')
+        self.reason = reason
+        return reason is None
+
+    """
+    Called when a run was started.
+
+    :rtype: None
+    """
+
+    def on_admit(self) -> None:
+        self.last_admit = time.time()
+
+    """
+    Returns the CPU utilization since the previous call.
+
+    :return: busy fraction of all CPUs (0 - 1), None if unavailable
+    :rtype: float
+    """
+
+    def get_load(self) -> float:
+        times: Tuple[int, int] = self.read_cpu_times()
+        if times is None or self.cpu_times is None or times[1] <= self.cpu_times[1]:
+            self.cpu_times = times
+            return None
+        load: float = (times[0] - self.cpu_times[0]) / (times[1] - self.cpu_times[1])
+        self.cpu_times = times
+        return load
+
+    """
+    Reads accumulated CPU times from /proc/stat.
+
+    :return: (busy, total) CPU times, None if unavailable
+    :rtype: Tuple[int, int]
+    """
+
+    def read_cpu_times(self) -> Tuple[int, int]:
+        try:
+            with open('/proc/stat') as f:
+                # cpu user nice system idle iowait irq softirq steal ...
+                fields: List[int] = [int(x) for x in f.readline().split()[1:]]
+            idle: int = fields[3] + fields[4]
+            return sum(fields) - idle, sum(fields)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    """
+    Reads available memory from /proc/meminfo.
+
+    :return: available memory in MB, None if unavailable
+    :rtype: int
+    """
+
+    def get_free_memory(self) -> int:
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) // 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+
+"""
+Tunes the number of active slots at runtime. Aggregate steps/sec of the
+active runs is measured over a window of stop checks while all slots up to
+the current level are busy. The level then moves by one slot: it keeps its
+direction as long as growing gains (or shrinking doesn't lose) more than
+{min_gain} throughput, and reverses otherwise, hill-climbing toward the
+throughput knee. The knee found so far is saved and used as the starting
+level of later sweeps of the same config.
+"""
+
+
+class Concurrency():
+    # Min. relative throughput change that counts as a gain or loss
+    min_gain = 0.05
+
+    """
+    :param ArgParser args: ArgParser instance
+    :param str name: config name
+    """
+
+    def __init__(self, args: ArgParser, name: str):
+        self.path: str = os.path.join(os.path.dirname(args.config_path), 'concurrency.json')
+        self.name: str = name
+        self.max_slots: int = max(args.num_envs, 1)
+        # Seconds of valid measurements before the level changes
+        self.window: float = args.adapt_window if args.adapt_window > 0 else args.check_interval * 10
+        saved: int = self.load().get(name, {}).get('level')
+        self.limit: int = min(saved, self.max_slots) if saved else max(self.max_slots // 2, 1)
+        self.direction: int = 1
+        # Throughput of the previous level
+        self.last_rate: float = None
+        # Latest throughput by level
+        self.rates: Dict[int, float] = {}
+        # Latest steps by run count and time of the previous measurement
+        self.prev_steps: Dict[int, int] = {}
+        self.prev_time: float = None
+        # Steps and seconds accumulated in the current window
+        self.steps: int = 0
+        self.time: float = 0.0
+        log(f'Adaptive concurrency: starting with {self.limit} of {self.max_slots} slots'
+            f'{" (saved level)" if saved else ""}.')
+
+    """
+    Adds a measurement. The interval since the previous one only counts if
+    the same runs were active, reporting steps, and filling all slots up to the level.
+
+    :param Dict[int, int] steps: latest steps of the active runs by run count
+    :rytpe: None
+    """
+
+    def update(self, steps: Dict[int, int]) -> None:
+        now: float = time.time()
+        if self.prev_time is not None and len(steps) == self.limit and steps.keys() == self.prev_steps.keys():
+            self.steps += sum(max(s - self.prev_steps[n], 0) for n, s in steps.items())
+            self.time += now - self.prev_time
+        self.prev_steps = steps
+        self.prev_time = now
+        if self.time >= self.window:
+            self.adapt(self.steps / self.time)
+
+    """
+    Moves the level by one slot, based on the throughput of the current level.
+
+    :param float rate: steps/sec at the current level
+    :rytpe: None
+    """
+
+    def adapt(self, rate: float) -> None:
+        self.rates[self.limit] = rate
+        if self.last_rate is not None:
+            threshold: float = self.last_rate * (1 + self.min_gain * self.direction)
+            if rate < threshold:
+                self.direction = -self.direction
+        if not 1 <= self.limit + self.direction <= self.max_slots:
+            self.direction = -self.direction
+        level: int = min(max(self.limit + self.direction, 1), self.max_slots)
+        log(f'Adaptive concurrency: {rate:.1f} steps/sec with {self.limit} slots, '
+            f'{"keeping" if level == self.limit else "switching to"} {level}.')
+        self.last_rate = rate
+        self.limit = level
+        self.steps = 0
+        self.time = 0.0
+        self.save()
+
+    """
+    Returns the smallest level whose throughput is within {min_gain} of the best one.
+
+    :return: knee level, None if no level was measured yet
+    :rytpe: int
+    """
+
+    def get_knee(self) -> int:
+        if not self.rates:
+            return None
+        best: float = max(self.rates.values())
+        return min(level for level, rate in self.rates.items() if rate >= best * (1 - self.min_gain))
+
+    """
+    Loads saved levels.
+
+    :return: saved levels and rates by config name
+    :rytpe: Dict[str, Any]
+    """
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    """
+    Saves the knee level and the measured rates.
+
+    :rytpe: None
+    """
+
+    def save(self) -> None:
+        levels: Dict[str, Any] = self.load()
+        levels[self.name] = {'level': self.get_knee(),
+                             'rates': {str(k): round(v, 3) for k, v in sorted(self.rates.items())}}
+        try:
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(levels, f, indent=2)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            log(f'Could not write to {self.path}.')
+
+
+"""
+Reclaims disk space from runs that are no longer needed. Checkpoints and
+models of stopped and failed runs are deleted, as well as those of completed
+runs that aren't among the top {keep_top} runs by a tag, once the scheduler
+won't resume them. Event files, run logs and configurations are kept.
+Optionally, trainer log files of finished runs are compressed. Files are
+processed by a background thread with the lowest CPU and I/O priority.
+"""
+
+
+class Retention():
+    # File types written by mlagents-learn checkpoints and model exports
+    checkpoint_types = ('.pt', '.onnx', '.nn', '.ckpt')
+
+    """
+    :param ArgParser args: ArgParser instance
+    :param Ledger ledger: Ledger instance, restores finished runs of a resumed sweep
+    """
+
+    def __init__(self, args: ArgParser, ledger: Ledger):
+        self.args: ArgParser = args
+        self.keep_top: int = args.keep_top
+        self.tag: str = args.keep_top_tag or args.rank_tag
+        self.compress: bool = args.compress_logs and args.backend == 'headless'
+        # Final tag values of completed runs with checkpoints, by run count
+        self.values: Dict[int, float] = {}
+        # Step budgets of these runs. Hyperband runs are only compared with runs of the same
+        # rung, runs of higher rungs rank above all runs of lower rungs.
+        self.budgets: Dict[int, int] = {}
+        self.by_budget: bool = args.scheduler == 'hyperband'
+        # Bytes deleted and compressed files
+        self.freed: int = 0
+        self.num_compressed: int = 0
+        # (run count, prune checkpoints, thread stopping the run's process) tuples, None ends the worker
+        self.tasks: queue.Queue = queue.Queue()
+        self.worker: threading.Thread = threading.Thread(target=self.process_tasks, daemon=True)
+        self.worker.start()
+
+        for n, r in ledger.get_states().items():
+            if r['state'] in ('stopped', 'failed'):
+                self.tasks.put((n, self.keep_top > 0, None))
+            elif r['state'] == 'complete':
+                self.values[n] = (r.get('metrics') or {}).get(self.tag)
+                self.budgets[n] = r.get('max_steps') or 0
+        if self.keep_top > 0:
+            log(f'Retention: keeping checkpoints of the top {self.keep_top} runs by {self.tag}.')
+        if self.compress:
+            log('Retention: compressing trainer logs of finished runs.')
+
+    """
+    Called when a run was started. Resumed runs are ranked again when they finish,
+    their checkpoints must not be deleted while they are training.
+
+    :param int n: run count
+    :rytpe: None
+    """
+
+    def on_start(self, n: int) -> None:
+        self.values.pop(n, None)
+        self.budgets.pop(n, None)
+
+    """
+    Called when a run has exited or was stopped. Runs that can't make it into
+    the top {keep_top} anymore, and won't be resumed, are pruned.
+
+    :param int n: run count
+    :param str state: 'complete', 'failed' or 'stopped'
+    :param float value: final {tag} value, None if there is no data
+    :param int max_steps: the run's step budget, None if it trained for the config's max_steps
+    :param Any scheduler: scheduler, tells which runs might be resumed
+    :param threading.Thread stopping: thread waiting for a stopped run's process group, if any
+    :rytpe: None
+    """
+
+    def on_finish(self, n: int, state: str, value: float, max_steps: int, scheduler: Any,
+                  stopping: threading.Thread = None) -> None:
+        if state != 'complete':
+            self.values.pop(n, None)
+            self.budgets.pop(n, None)
+            self.tasks.put((n, self.keep_top > 0, stopping))
+            return
+        self.values[n] = value
+        self.budgets[n] = max_steps or 0
+        if self.compress:
+            self.tasks.put((n, False, None))
+        if self.keep_top <= 0:
+            return
+        ranked: List[int] = sorted(self.values, key=self.get_rank, reverse=True)
+        for k in ranked[self.keep_top:]:
+            if not scheduler.may_resume(k):
+                del self.values[k]
+                del self.budgets[k]
+                self.tasks.put((k, True, None))
+
+    """
+    Returns the sort key of a completed run.
+
+    :param int n: run count
+    :return: step budget (hyperband only) and final {tag} value
+    :rytpe: Tuple[int, float]
+    """
+
+    def get_rank(self, n: int) -> Tuple[int, float]:
+        value: float = -math.inf if self.values[n] is None else self.values[n]
+        return (self.budgets[n] if self.by_budget else 0), value
+
+    """
+    Deletes checkpoints and compresses log files, until close is called.
+
+    :rytpe: None
+    """
+
+    def process_tasks(self) -> None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            if platform.system() == 'Linux':
+                # Idle I/O class, the thread only gets disk time when no other process needs it
+                subprocess.run(['ionice', '-c3', '-p', str(threading.get_native_id())],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            task: Tuple[int, bool, threading.Thread] = self.tasks.get()
+            if task is None:
+                return
+            n, prune, stopping = task
+            if stopping:
+                # Trainers save a checkpoint when they are interrupted
+                stopping.join()
+            if prune:
+                self.prune(n)
+            if self.compress:
+                self.compress_logs(n)
+
+    """
+    Deletes the checkpoints and models of a run.
+
+    :param int n: run count
+    :rytpe: None
+    """
+
+    def prune(self, n: int) -> None:
+        run_id: str = self.args.get_run_id(n)
+        size: int = 0
+        for root, dirs, files in os.walk(os.path.join(self.args.results_dir, run_id)):
+            for name in files:
+                if name.endswith(Retention.checkpoint_types):
+                    path: str = os.path.join(root, name)
+                    try:
+                        file_size: int = os.path.getsize(path)
+                        os.remove(path)
+                        size += file_size
+                    except OSError:
+                        log(f'Could not delete {path}.')
+        if size:
+            self.freed += size
+            log(f'Retention: deleted checkpoints of {run_id} ({size / 1024 ** 2:.1f} MB).')
+
+    """
+    Appends a run's trainer log files to a gzip file and deletes them.
+    Resumed runs write new log files, which are appended as additional gzip members.
+
+    :param int n: run count
+    :rytpe: None
+    """
+
+    def compress_logs(self, n: int) -> None:
+        path: str = os.path.join(self.args.log_dir, self.args.get_run_id(n) + '.log')
+        # Oldest rotated file first
+        paths: List[str] = [f'{path}.{k}' for k in range(HeadlessBackend.log_backups, 0, -1)] + [path]
+        paths = [p for p in paths if os.path.isfile(p)]
+        if not paths:
+            return
+        try:
+            with gzip.open(path + '.gz', 'ab') as out:
+                for p in paths:
+                    with open(p, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+            for p in paths:
+                os.remove(p)
+            self.num_compressed += len(paths)
+        except OSError:
+            log(f'Could not compress {path}.')
+
+    """
+    Waits for pending tasks and logs the reclaimed space.
+
+    :rytpe: None
+    """
+
+    def close(self) -> None:
+        self.tasks.put(None)
+        self.worker.join()
+        log(f'Retention: {self.freed / 1024 ** 2:.1f} MB of checkpoints deleted, '
+            f'{self.num_compressed} log files compressed.')
+
+
+"""
+Launches trainers in console windows.
+On Linux, stopping a run only closes the terminal launcher,
+use the headless backend for reliable process control.
+"""
+
+
+class TerminalBackend():
+    """
+    Launches a trainer subprocess.
+
+    :param List[str] args: process arguments
+    :param str run_id: run id
+    :return: the subprocess
+    :rtype: subprocess.Popen
+    """
+
+    def start(self, args: List[str], run_id: str) -> subprocess.Popen:
+        if platform.system() == 'Windows':
+            return subprocess.Popen(args, creationflags=subprocess.CREATE_NEW_CONSOLE)
+        # --wait keeps the launcher alive until the trainer exits
+        return subprocess.Popen('gnome-terminal --wait -- ' + ' '.join(args), shell=True)
+
+    """
+    Stops a trainer subprocess.
+
+    :param subprocess.Popen process: the subprocess
+    :return: None, stopping doesn't need to be awaited
+    :rtype: threading.Thread
+    """
+
+    def stop(self, process: subprocess.Popen) -> threading.Thread:
+        process.terminate()
+        return None
+
+
+"""
+Launches trainers directly, without a console window, each one in its own
+process group. Output is written to rotating per-run log files by reader
+threads. Stopping a run signals the whole process group, which includes
+the Unity environments started by the trainer.
+"""
+
+
+class HeadlessBackend():
+    # Seconds to wait for a graceful shutdown before killing the process group
+    stop_timeout = 30
+    # Number of rotated log files to keep
+    log_backups = 3
+
+    """
+    :param ArgParser args: ArgParser instance
+    """
+
+    def __init__(self, args: ArgParser):
+        self.log_dir: str = args.log_dir
+        self.log_max_bytes: int = args.log_max_bytes
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    """
+    Launches a trainer subprocess.
+
+    :param List[str] args: process arguments
+    :param str run_id: run id
+    :return: the subprocess
+    :rtype: subprocess.Popen
+    """
+
+    def start(self, args: List[str], run_id: str) -> subprocess.Popen:
+        if platform.system() == 'Windows':
+            process: subprocess.Popen = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                         creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            process: subprocess.Popen = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                         start_new_session=True)
+        path: str = os.path.join(self.log_dir, run_id + '.log')
+        threading.Thread(target=self.write_log, args=(process, path), daemon=True).start()
+        return process
+
+    """
+    Copies the output of a subprocess to a rotating log file.
+    Runs in a separate thread for each subprocess.
+
+    :param subprocess.Popen process: the subprocess
+    :param str path: log file path
+    :rtype: None
+    """
+
+    def write_log(self, process: subprocess.Popen, path: str) -> None:
+        handler: logging.handlers.RotatingFileHandler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=self.log_max_bytes, backupCount=HeadlessBackend.log_backups, encoding='utf-8')
+        try:
+            for line in iter(process.stdout.readline, b''):
+                msg: str = line.decode('utf-8', errors='replace').rstrip('\r\n')
+                handler.handle(logging.makeLogRecord({'msg': msg}))
+        finally:
+            handler.close()
+            process.stdout.close()
+
+    """
+    Stops a trainer subprocess and its children. Sends an interrupt first,
+    so mlagents-learn can save a checkpoint, and kills the process group
+    if it is still running after stop_timeout seconds.
+
+    :param subprocess.Popen process: the subprocess
+    :return: thread waiting for the process group to exit
+    :rtype: threading.Thread
+    """
+
+    def stop(self, process: subprocess.Popen) -> threading.Thread:
+        if platform.system() == 'Windows':
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            self.signal_group(process, signal.SIGINT)
+        thread: threading.Thread = threading.Thread(target=self.kill_group, args=(process,), daemon=True)
+        thread.start()
+        return thread
+
+    """
+    Kills a process group if it doesn't exit within stop_timeout seconds.
+
+    :param subprocess.Popen process: the subprocess
+    :rtype: None
+    """
+
+    def kill_group(self, process: subprocess.Popen) -> None:
+        try:
+            process.wait(timeout=HeadlessBackend.stop_timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        if platform.system() == 'Windows':
+            subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            # Environment processes might outlive the trainer
+            self.signal_group(process, signal.SIGKILL)
+
+    """
+    Sends a signal to the process group of a subprocess.
+
+    :param subprocess.Popen process: the subprocess, a process group leader
+    :param int sig: signal
+    :rtype: None
+    """
+
+    def signal_group(self, process: subprocess.Popen, sig: int) -> None:
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass  # Group has exited already
+
+
+"""
+Handle for a run that was published to the job queue of a distributed
+sweep. Mimics the subprocess.Popen methods used by the runner, the return
+code is set when the worker running the job reports its exit.
+"""
+
+
+class RemoteProcess():
+    """
+    :param Dict[str, Any] job: job data sent to the worker
+    """
+
+    def __init__(self, job: Dict[str, Any]):
+        self.job: Dict[str, Any] = job
+        self.returncode: int = None
+        # ID of the worker that claimed the job, None while queued
+        self.worker: int = None
+        # Time of the worker's last report
+        self.last_report: float = 0
+        # Whether the worker was asked to stop the run
+        self.stopping: bool = False
+        self.exited: threading.Event = threading.Event()
+
+    """
+    Returns the return code, None if the run is still active.
+
+    :return: return code
+    :rtype: int
+    """
+
+    def poll(self) -> int:
+        return self.returncode
+
+    """
+    Waits for the run to exit.
+
+    :param float timeout: max. seconds to wait, waits indefinitely if None
+    :return: return code, None if the run is still active
+    :rtype: int
+    """
+
+    def wait(self, timeout: float = None) -> int:
+        self.exited.wait(timeout)
+        return self.returncode
+
+    """
+    Sets the return code.
+
+    :param int code: return code
+    :rtype: None
+    """
+
+    def exit(self, code: int) -> None:
+        self.returncode = code
+        self.exited.set()
+
+
+"""
+Stores scalar values that workers read from their local event files
+and report to the controller of a distributed sweep.
+"""
+
+
+class RemoteMetricSource():
+    def __init__(self):
+        # Scalar values by verbose run id and tag
+        self.scalars: Dict[str, Dict[str, List[Tuple[int, float]]]] = {}
+        # Reports are added by the server thread
+        self.lock: threading.Lock = threading.Lock()
+
+    """
+    Returns all scalar values for specified run and tag.
+
+    :param str run_id: verbose run id
+    :param str tag: TensorBoard tag
+    :return: list of (step, value) tuples, empty if no data is available
+    :rtype: List[Tuple[int, float]]
+    """
+
+    def get_scalars(self, run_id: str, tag: str) -> List[Tuple[int, float]]:
+        with self.lock:
+            return list(self.scalars.get(run_id, {}).get(tag, []))
+
+    """
+    Appends reported scalar values.
+
+    :param str run_id: verbose run id
+    :param str tag: TensorBoard tag
+    :param List[Tuple[int, float]] data: new (step, value) tuples
+    :rtype: None
+    """
+
+    def add(self, run_id: str, tag: str, data: List[Tuple[int, float]]) -> None:
+        with self.lock:
+            self.scalars.setdefault(run_id, {}).setdefault(tag, []).extend(data)
+
+
+"""
+Publishes runs to a job queue instead of launching them, for sweeps
+distributed across several machines. Workers connect to an XML-RPC server,
+claim jobs, and report the status and scalar values of their runs.
+Each worker is assigned its own port range when it registers.
+"""
+
+
+class RemoteBackend():
+    # Seconds without a report until a claimed run is considered lost
+    worker_timeout = 120
+
+    """
+    :param ArgParser args: ArgParser instance
+    :param Config config: Config instance
+    """
+
+    def __init__(self, args: ArgParser, config: Any):
+        self.results_dir: str = args.results_dir
+        # Behavior names, for mapping reported scalars to verbose run ids
+        self.behavior_names: List[str] = [b.name for b in config.behaviors]
+        # Tags that workers report
+        self.tags: List[str] = list(dict.fromkeys([args.rank_tag] + [c.tag for c in config.stop_conditions]))
+        # First port of the next worker's range
+        self.next_port: int = args.base_port
+        self.workers: List[str] = []
+        # Queued jobs in start order
+        self.queue: List[RemoteProcess] = []
+        # Queued and claimed jobs by key
+        self.processes: Dict[str, RemoteProcess] = {}
+        self.num_jobs: int = 0
+        # Set when the sweep is complete
+        self.done: bool = False
+        self.lock: threading.Lock = threading.Lock()
+        self.metrics: RemoteMetricSource = RemoteMetricSource()
+
+        self.server: SimpleXMLRPCServer = SimpleXMLRPCServer(('', args.serve), allow_none=True, logRequests=False)
+        self.server.register_function(self.register, 'register')
+        self.server.register_function(self.claim, 'claim')
+        self.server.register_function(self.report, 'report')
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self.watch_workers, daemon=True).start()
+        log(f'Serving jobs on port {args.serve}.')
+
+    """
+    Publishes a run to the job queue. The config file contents are sent
+    along with the job, ports are assigned by the worker.
+
+    :param List[str] args: process arguments
+    :param str run_id: run id
+    :return: handle for the queued run
+    :rtype: RemoteProcess
+    """
+
+    def start(self, args: List[str], run_id: str) -> RemoteProcess:
+        config: str = None
+        process_args: List[str] = []
+        for arg in args:
+            if config is None and arg.endswith('.yaml'):
+                with open(arg) as f:
+                    config = f.read()
+                process_args.append('{config}')
+            elif not arg.startswith('--base-port='):
+                process_args.append(arg)
+
+        with self.lock:
+            key: str = str(self.num_jobs)
+            self.num_jobs += 1
+            process: RemoteProcess = RemoteProcess({'key': key, 'run_id': run_id, 'args': process_args,
+                                                    'config': config, 'behaviors': self.behavior_names,
+                                                    'tags': self.tags, 'results_dir': self.results_dir})
+            self.queue.append(process)
+            self.processes[key] = process
+        return process
+
+    """
+    Stops a run. Queued runs are removed from the queue, claimed runs
+    are stopped by their worker with its next report.
+
+    :param RemoteProcess process: the run's handle
+    :return: thread waiting for the run to exit
+    :rtype: threading.Thread
+    """
+
+    def stop(self, process: RemoteProcess) -> threading.Thread:
+        with self.lock:
+            if process in self.queue:
+                self.queue.remove(process)
+                del self.processes[process.job['key']]
+                process.exit(-1)
+                return None
+            process.stopping = True
+        thread: threading.Thread = threading.Thread(target=process.wait, args=(RemoteBackend.worker_timeout,),
+                                                    daemon=True)
+        thread.start()
+        return thread
+
+    """
+    Marks the sweep as complete and shuts down the server,
+    after idle workers had a chance to notice.
+
+    :rtype: None
+    """
+
+    def close(self) -> None:
+        self.done = True
+        time.sleep(Worker.poll_interval * 2)
+        self.server.shutdown()
+
+    """
+    Registers a worker and assigns it a port range.
+    Called by workers.
+
+    :param str name: worker host name
+    :param int num_slots: number of concurrent runs on the worker
+    :return: worker id and first port of its range
+    :rtype: Dict[str, int]
+    """
+
+    def register(self, name: str, num_slots: int) -> Dict[str, int]:
+        with self.lock:
+            worker_id: int = len(self.workers)
+            self.workers.append(name)
+            port: int = self.next_port
+            self.next_port += num_slots
+        log(f'Worker {worker_id} ({name}) registered, {num_slots} slots, ports {port}-{port + num_slots - 1}.')
+        return {'worker_id': worker_id, 'base_port': port}
+
+    """
+    Hands the next queued job to a worker.
+    Called by workers.
+
+    :param int worker_id: worker id
+    :return: job data, or {'done': bool} if the queue is empty
+    :rtype: Dict[str, Any]
+    """
+
+    def claim(self, worker_id: int) -> Dict[str, Any]:
+        with self.lock:
+            if not self.queue:
+                return {'done': self.done}
+            process: RemoteProcess = self.queue.pop(0)
+            process.worker = worker_id
+            process.last_report = time.time()
+        log(f'{process.job["run_id"]} claimed by worker {worker_id} ({self.workers[worker_id]}).')
+        return process.job
+
+    """
+    Receives new scalar values of a run and its return code once it has exited.
+    Called by workers.
+
+    :param int worker_id: worker id
+    :param str key: job key
+    :param int code: return code, None if the run is still active
+    :param Dict[str, Dict[str, List[List[float]]]] scalars: new [step, value] pairs by behavior name and tag
+    :return: true if the worker must stop the run
+    :rtype: bool
+    """
+
+    def report(self, worker_id: int, key: str, code: int, scalars: Dict[str, Dict[str, List[List[float]]]]) -> bool:
+        with self.lock:
+            process: RemoteProcess = self.processes.get(key)
+            if process is None or process.worker != worker_id:
+                return True  # Unknown or lost job
+            process.last_report = time.time()
+            if code is not None:
+                del self.processes[key]
+
+        for name, series in scalars.items():
+            for tag, data in series.items():
+                self.metrics.add(os.path.join(process.job['run_id'], name), tag,
+                                 [(int(step), value) for step, value in data])
+        if code is not None:
+            # Scalars are stored first, they are read when the exit is handled
+            process.exit(code)
+        return process.stopping
+
+    """
+    Fails claimed runs whose worker hasn't reported for worker_timeout seconds.
+    Runs in a separate thread.
+
+    :rtype: None
+    """
+
+    def watch_workers(self) -> None:
+        while True:
+            time.sleep(10)
+            lost: List[RemoteProcess] = []
+            with self.lock:
+                for key, process in list(self.processes.items()):
+                    if process.worker is not None and \
+                            time.time() - process.last_report > RemoteBackend.worker_timeout:
+                        del self.processes[key]
+                        lost.append(process)
+            for process in lost:
+                log(f'Lost contact with worker {process.worker} ({self.workers[process.worker]}) '
+                    f'running {process.job["run_id"]}.')
+                process.exit(-1)
+
+
+"""
+Order in which new runs are started, so that partial sweeps cover the space.
+* 'grid' nested loop order, the last axis changes fastest.
+* 'interleaved' steps through the grid with a stride close to total / golden ratio,
+  consecutive runs differ in all axes.
+* 'spread' coarse to fine: the bits of the position are distributed round robin
+  over the axes' value indices, most significant bits first. The first runs
+  cover the first and middle values of every axis, then the quarters, and so on.
+  Sample points are space filling already, sampled sweeps use 'interleaved' instead.
+* 'priority' highest sum of opt_priority values first.
+* 'shortest' lowest max_steps first.
+Grid sweeps limited by max-runs pick their runs from all combinations, except in 'grid' order.
+"""
+
+
+class RunOrder():
+    """
+    :param str method: 'grid', 'interleaved', 'spread', 'priority' or 'shortest'
+    :param Config config: Config instance
+    """
+
+    def __init__(self, method: str, config: Config):
+        self.config: Config = config
+        grid: bool = config.sampler is None and not config.zip_behaviors
+        # Number of runs to pick from
+        self.total: int = config.num_runs
+        if grid and method != 'grid':
+            self.total = 1
+            for size in config.get_axis_sizes():
+                self.total *= size
+        if method == 'spread' and not grid:
+            log('Spread order requires a grid without zipped behaviors, using interleaved order instead.')
+            method = 'interleaved'
+
+        if method == 'interleaved':
+            self.runs: Iterator[int] = self.interleave()
+        elif method == 'spread':
+            self.runs: Iterator[int] = self.spread(config.get_axis_sizes())
+        elif method == 'priority':
+            self.runs: Iterator[int] = iter(heapq.nsmallest(config.num_runs, range(self.total),
+                                                            key=lambda n: -config.get_priority(n)))
+        elif method == 'shortest':
+            self.runs: Iterator[int] = iter(heapq.nsmallest(config.num_runs, range(self.total),
+                                                            key=config.get_run_steps))
+        else:
+            self.runs: Iterator[int] = iter(range(self.total))
+        if method != 'grid':
+            log(f'Run order: {method}')
+
+    """
+    Returns the run count of the next run.
+
+    :return: run count
+    :rtype: int
+    """
+
+    def next_run(self) -> int:
+        return next(self.runs)
+
+    """
+    Steps through all runs with a stride coprime to their number.
+
+    :return: run counts
+    :rtype: Iterator[int]
+    """
+
+    def interleave(self) -> Iterator[int]:
+        stride: int = max(round(self.total / (1 + math.sqrt(5)) * 2), 1)
+        while math.gcd(stride, self.total) != 1:
+            stride += 1
+        for k in range(self.total):
+            yield k * stride % self.total
+
+    """
+    Generates grid combinations coarse to fine. Value indices are padded to
+    powers of two, positions beyond an axis' size are skipped.
+
+    :param List[int] sizes: number of values by axis
+    :return: run counts
+    :rtype: Iterator[int]
+    """
+
+    def spread(self, sizes: List[int]) -> Iterator[int]:
+        remaining: List[int] = [(size - 1).bit_length() for size in sizes]
+        # (axis, value index bit) for each position bit
+        bits: List[Tuple[int, int]] = []
+        while any(remaining):
+            for j in range(len(sizes)):
+                if remaining[j]:
+                    remaining[j] -= 1
+                    bits.append((j, 1 << remaining[j]))
+        for position in range(1 << len(bits)):
+            digits: List[int] = [0] * len(sizes)
+            for t, (j, bit) in enumerate(bits):
+                if position >> t & 1:
+                    digits[j] += bit
+            if all(d < size for d, size in zip(digits, sizes)):
+                n: int = 0
+                for d, size in zip(digits, sizes):
+                    n = n * size + d
+                yield n
+
+
+"""
+A training run to be started by the runner.
+"""
+
+
+class Job():
+    """
+    :param int n: run count
+    :param int max_steps: overrides config max_steps if set
+    :param bool resume: whether to resume a previous run
+    :param float queued: time the job was queued, None if it was runnable from the start of the sweep
+    :param str initialize_from: run ID to initialize the model from, if any
+    """
+
+    def __init__(self, n: int, max_steps: int = None, resume: bool = False, queued: float = None,
+                 initialize_from: str = None):
+        self.n: int = n
+        self.max_steps: int = max_steps
+        self.resume: bool = resume
+        self.queued: float = queued
+        self.initialize_from: str = initialize_from
+
+    def __str__(self) -> str:
+        return f'n: {str(self.n)}, max_steps: {str(self.max_steps)}, resume: {str(self.resume)}'
+
+
+"""
+Schedules all runs in order, each one trains for max_steps.
+Base class for the other schedulers.
+"""
+
+
+class GridScheduler():
+    """
+    :param Config config: Config instance
+    :param ArgParser args: ArgParser instance
+    :param Ledger ledger: Ledger instance
+    """
+
+    def __init__(self, config: Config, args: ArgParser, ledger: Ledger):
+        self.config: Config = config
+        self.ledger: Ledger = ledger
+        # Number of runs taken from the run order
+        self.run_count: int = 0
+        # Model based and population based search start their runs in sample order
+        self.order: RunOrder = RunOrder(args.order if args.scheduler in ('grid', 'hyperband') else 'grid', config)
+        # Next run from the run order that hasn't been done before
+        self.next_run: int = None
+        # Interrupted jobs of a resumed sweep, started before any new ones
+        self.resumed: List[Job] = []
+        # Runs of a resumed sweep that don't need to be started again
+        self.done: Set[int] = set()
+
+    """
+    Restores the scheduler state from the ledger of an interrupted sweep.
+    Finished runs are skipped, interrupted runs are resumed.
+
+    :rytpe: None
+    """
+
+    def restore(self) -> None:
+        for n, r in self.ledger.get_states().items():
+            self.restore_point(r)
+            if r['state'] == 'started':
+                self.resumed.append(Job(n, r.get('max_steps'), True))
+            self.done.add(n)
+        log(f'{len(self.done) - len(self.resumed)} runs finished, {len(self.resumed)} runs to resume.')
+
+    """
+    Restores a run's sample point, in case it was chosen at runtime.
+
+    :param Dict[str, Any] record: ledger record
+    :rytpe: None
+    """
+
+    def restore_point(self, record: Dict[str, Any]) -> None:
+        if self.config.sampler and 'point' in record:
+            self.config.sampler.set_point(record['run'], record['point'])
+
+    """
+    Whether there are any pending jobs.
+
+    :return: true if there are any pending jobs
+    :rytpe: bool
+    """
+
+    def has_pending(self) -> bool:
+        while self.next_run is None and self.run_count < self.config.num_runs:
+            n: int = self.order.next_run()
+            self.run_count += 1
+            if n not in self.done:
+                self.next_run = n
+        return len(self.resumed) > 0 or self.next_run is not None
+
+    """
+    Returns the next job.
+
+    :return: next job
+    :rytpe: Job
+    """
+
+    def next_job(self) -> Job:
+        if self.resumed:
+            return self.resumed.pop(0)
+        self.has_pending()
+        n: int = self.next_run
+        self.next_run = None
+        return Job(n)
+
+    """
+    Called when a job's process has exited or was stopped.
+
+    :param Job job: the finished job
+    :param int code: process return code, None if stopped
+    :param float value: final rank tag value, None if there is no data
+    :rytpe: None
+    """
+
+    def on_job_done(self, job: Job, code: int, value: float) -> None:
+        pass
+
+    """
+    Whether a finished run might be resumed later.
+
+    :param int n: run count
+    :return: true if the run's checkpoints are still needed
+    :rytpe: bool
+    """
+
+    def may_resume(self, n: int) -> bool:
+        return False
+
+
+"""
+Successive halving: all runs train for a small step budget first (rung 0).
+Runs are then ranked by their final rank tag value, and only the top
+1/eta fraction is resumed with an eta times larger budget, rung by rung,
+until max_steps is reached. Stopped and failed runs aren't promoted.
+"""
+
+
+class HyperbandScheduler(GridScheduler):
+    """
+    :param Config config: Config instance
+    :param ArgParser args: ArgParser instance
+    :param Ledger ledger: Ledger instance
+    """
+
+    def __init__(self, config: Config, args: ArgParser, ledger: Ledger):
+        super().__init__(config, args, ledger)
+        self.eta: int = max(args.eta, 2)
+        # Step budgets by rung
+        self.budgets: List[int] = HyperbandScheduler.get_budgets(config.get_max_steps(), args.min_steps, self.eta)
+        log(f'Hyperband rung budgets: {", ".join(map(str, self.budgets))} steps')
+        for b in config.behaviors:
+            if b.get_max_steps_option() is not None:
+                log(f'Warning: max_steps of {b.name} is varied, but hyperband rungs override it with their '
+                    f'step budgets. The last rung trains for {self.budgets[-1]} steps, the option has no effect.')
+
+        self.rung: int = 0
+        self.pending: List[Job] = [Job(self.order.next_run(), self.budgets[0]) for _ in range(config.num_runs)]
+        self.num_active: int = 0
+        # (rank value, run count) of this rung's jobs which completed successfully
+        self.completed: List[Tuple[float, int]] = []
+
+    """
+    Returns the step budgets of the rungs, each eta times larger than the
+    previous one, the last one is max_steps.
+
+    :param int max_steps: steps of the last rung
+    :param int min_steps: steps of the first rung, max_steps / eta^2 if 0
+    :param int eta: reduction factor
+    :return: step budgets by rung
+    :rtype: List[int]
+    """
+
+    @staticmethod
+    def get_budgets(max_steps: int, min_steps: int, eta: int) -> List[int]:
+        steps: int = min_steps if min_steps > 0 else max_steps // eta ** 2
+        budgets: List[int] = []
+        while 0 < steps < max_steps:
+            budgets.append(steps)
+            steps *= eta
+        budgets.append(max_steps)
+        return budgets
+
+    """
+    Returns the number of runs promoted to the next rung.
+
+    :param int num_ranked: number of ranked runs in the current rung
+    :param int eta: reduction factor
+    :return: number of promoted runs
+    :rtype: int
+    """
+
+    @staticmethod
+    def get_num_promoted(num_ranked: int, eta: int) -> int:
+        return max(num_ranked // eta, 1) if num_ranked else 0
+
+    """
+    Whether there are any pending jobs in the current rung.
+
+    :return: true if there are any pending jobs
+    :rytpe: bool
+    """
+
+    def has_pending(self) -> bool:
+        return len(self.pending) > 0
+
+    """
+    Returns the next job of the current rung.
+
+    :return: next job
+    :rytpe: Job
+    """
+
+    def next_job(self) -> Job:
+        self.num_active += 1
+        return self.pending.pop(0)
+
+    """
+    Restores the current rung from the ledger of an interrupted sweep.
+    Queued and interrupted runs of the current rung are resumed.
+
+    :rytpe: None
+    """
+
+    def restore(self) -> None:
+        records: List[Dict[str, Any]] = [r for r in self.ledger.records if r.get('max_steps') in self.budgets]
+        self.rung = max([self.budgets.index(r['max_steps']) for r in records], default=0)
+        states: Dict[int, Dict[str, Any]] = {}
+        for r in records:
+            if r['max_steps'] == self.budgets[self.rung]:
+                states[r['run']] = r
+
+        budget: int = self.budgets[self.rung]
+        if self.rung == 0:
+            # Runs that were never started are still pending
+            self.pending = [job for job in self.pending if job.n not in states]
+        else:
+            self.pending = []
+        for n, r in states.items():
+            if r['state'] in ('queued', 'started'):
+                self.pending.append(Job(n, budget, self.rung > 0 or r['state'] == 'started'))
+            elif r['state'] == 'complete':
+                self.completed.append((r.get('value'), n))
+        log(f'Resuming hyperband rung {self.rung}: {len(self.completed)} runs complete, '
+            f'{len(self.pending)} pending.')
+        if not self.pending:
+            self.promote()
+
+    """
+    Called when a job's process has exited or was stopped.
+    Promotes runs to the next rung once the current rung is done.
+
+    :param Job job: the finished job
+    :param int code: process return code, None if stopped
+    :param float value: final rank tag value, None if there is no data
+    :rytpe: None
+    """
+
+    def on_job_done(self, job: Job, code: int, value: float) -> None:
+        self.num_active -= 1
+        if code == 0:
+            self.completed.append((value, job.n))
+        if self.num_active == 0 and not self.pending:
+            self.promote()
+
+    """
+    Whether a finished run might be promoted, or has been promoted but not started yet.
+
+    :param int n: run count
+    :return: true if the run's checkpoints are still needed
+    :rytpe: bool
+    """
+
+    def may_resume(self, n: int) -> bool:
+        if any(job.n == n for job in self.pending):
+            return True
+        # Runs of the last rung aren't promoted
+        return self.rung < len(self.budgets) - 1 and any(k == n for value, k in self.completed)
+
+    """
+    Ranks the completed runs of the current rung and queues
+    the top fraction for the next rung.
+
+    :rytpe: None
+    """
+
+    def promote(self) -> None:
+        if self.rung == len(self.budgets) - 1:
+            return
+        ranked: List[Tuple[float, int]] = [x for x in self.completed if x[0] is not None]
+        ranked.sort(reverse=True)
+
+        num_promoted: int = HyperbandScheduler.get_num_promoted(len(ranked), self.eta)
+        self.rung += 1
+        self.completed = []
+        for value, n in ranked[:num_promoted]:
+            self.pending.append(Job(n, self.budgets[self.rung], True, time.time()))
+            self.ledger.record(n, 'queued', max_steps=self.budgets[self.rung])
+        log(f'Hyperband rung {self.rung}: promoting {num_promoted} of {len(ranked)} runs '
+            f'to {self.budgets[self.rung]} steps.')
+
+
+"""
+Sequential model-based search with a Tree-structured Parzen Estimator.
+The first runs use the config's sample points. After that, each run's
+point is chosen by fitting two Parzen densities to the completed runs'
+sample points: l(x) for the best {gamma} fraction by final rank tag
+value, and g(x) for the rest. Candidates are drawn from l(x), and the
+one maximizing l(x) / g(x) is used.
+"""
+
+
+class TPEScheduler(GridScheduler):
+    gamma = 0.25
+    num_candidates = 24
+    min_bandwidth = 0.05
+
+    """
+    :param Config config: Config instance
+    :param ArgParser args: ArgParser instance
+    :param Ledger ledger: Ledger instance
+    """
+
+    def __init__(self, config: Config, args: ArgParser, ledger: Ledger):
+        super().__init__(config, args, ledger)
+        self.num_startup: int = args.tpe_startup
+        self.rng: random.Random = random.Random(args.sampler_seed)
+        # (sample point, final rank value) for completed runs
+        self.observations: List[Tuple[List[float], float]] = []
+
+    """
+    Returns the next job, its sample point is suggested by the model
+    once there are enough observations. Resumed runs keep the point
+    restored from the ledger.
+
+    :return: next job
+    :rytpe: Job
+    """
+
+    def next_job(self) -> Job:
+        job: Job = super().next_job()
+        if not job.resume and job.n >= self.num_startup and len(self.observations) >= 2:
+            self.config.sampler.set_point(job.n, self.suggest())
+        return job
+
+    """
+    Records the final rank value of a finished run.
+    Stopped runs are included, failed runs aren't.
+
+    :param Job job: the finished job
+    :param int code: process return code, None if stopped
+    :param float value: final rank tag value, None if there is no data
+    :rytpe: None
+    """
+
+    def on_job_done(self, job: Job, code: int, value: float) -> None:
+        if (code is None or code == 0) and value is not None:
+            self.observations.append((self.config.sampler.get_point(job.n), value))
+
+    """
+    Restores sample points and observations from the ledger
+    of an interrupted sweep.
+
+    :rytpe: None
+    """
+
+    def restore(self) -> None:
+        super().restore()
+        for r in self.ledger.get_states().values():
+            if r['state'] in ('complete', 'stopped', 'cached') and r.get('value') is not None:
+                self.observations.append((self.config.sampler.get_point(r['run']), r['value']))
+
+    """
+    Suggests the next sample point.
+
+    :return: coordinates in [0, 1)
+    :rtype: List[float]
+    """
+
+    def suggest(self) -> List[float]:
+        ranked: List[Tuple[List[float], float]] = sorted(self.observations, key=lambda x: x[1], reverse=True)
+        num_good: int = max(int(math.ceil(TPEScheduler.gamma * len(ranked))), 1)
+        good: List[List[float]] = [x[0] for x in ranked[:num_good]]
+        bad: List[List[float]] = [x[0] for x in ranked[num_good:]]
+        num_dims: int = len(good[0])
+
+        good_bw: List[float] = self.get_bandwidths(good, num_dims)
+        bad_bw: List[float] = self.get_bandwidths(bad, num_dims)
+
+        best: List[float] = None
+        best_score: float = -math.inf
+        for _ in range(TPEScheduler.num_candidates):
+            # Sample from l(x): pick a good point and perturb it
+            center: List[float] = self.rng.choice(good)
+            candidate: List[float] = [min(max(self.rng.gauss(center[d], good_bw[d]), 0), 0.999999)
+                                      for d in range(num_dims)]
+            score: float = (self.log_density(candidate, good, good_bw)
+                            - self.log_density(candidate, bad, bad_bw))
+            if score > best_score:
+                best, best_score = candidate, score
+        return best
+
+    """
+    Returns per dimension kernel bandwidths (Scott's rule).
+
+    :param List[List[float]] points: kernel centers
+    :param int num_dims: number of dimensions
+    :return: bandwidths
+    :rtype: List[float]
+    """
+
+    def get_bandwidths(self, points: List[List[float]], num_dims: int) -> List[float]:
+        result: List[float] = []
+        for d in range(num_dims):
+            values: List[float] = [p[d] for p in points]
+            std: float = 0
+            if len(values) > 1:
+                mean: float = sum(values) / len(values)
+                std = math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+            result.append(max(std * len(values) ** -0.2, TPEScheduler.min_bandwidth))
+        return result
+
+    """
+    Log density of a Parzen estimator with independent dimensions,
+    mixed with a uniform prior so it's never zero.
+
+    :param List[float] x: point
+    :param List[List[float]] points: kernel centers
+    :param List[float] bandwidths: per dimension bandwidths
+    :return: log density
+    :rtype: float
+    """
+
+    def log_density(self, x: List[float], points: List[List[float]], bandwidths: List[float]) -> float:
+        result: float = 0
+        weight: float = 1 / (len(points) + 1)
+        for d, bw in enumerate(bandwidths):
+            density: float = weight  # Uniform prior on [0, 1)
+            for p in points:
+                density += weight * math.exp(-0.5 * ((x[d] - p[d]) / bw) ** 2) / (bw * math.sqrt(2 * math.pi))
+            result += math.log(density)
+        return result
+
+
+"""
+Population Based Training: a fixed population of runs trains in segments
+of pbt_interval steps, one generation at a time. After each generation,
+members are ranked by their final rank tag value. The bottom {quantile}
+fraction, and all stopped or failed members, are replaced by new runs,
+initialized from the checkpoint of a random top member, with perturbed
+values (explore). All other members resume training for another segment.
+Lineage (parent run and generation) is recorded in the ledger.
+"""
+
+
+class PBTScheduler(GridScheduler):
+    quantile = 0.25
+    # Probability of resampling a coordinate instead of perturbing it
+    resample_prob = 0.25
+    # Perturbation of continuous coordinates, discrete ones move by one value
+    perturb_step = 0.2
+
+    """
+    :param Config config: Config instance
+    :param ArgParser args: ArgParser instance
+    :param Ledger ledger: Ledger instance
+    """
+
+    def __init__(self, config: Config, args: ArgParser, ledger: Ledger):
+        super().__init__(config, args, ledger)
+        self.args: ArgParser = args
+        self.rng: random.Random = random.Random(args.sampler_seed)
+        self.interval, self.num_generations = PBTScheduler.get_generations(config.get_max_steps(), args.pbt_interval)
+        self.axis_sizes: List[int] = config.get_axis_sizes()
+        log(f'PBT population: {config.num_runs}, {self.num_generations} generations of {self.interval} steps')
+
+        self.generation: int = 0
+        # New members get run counts after the initial population
+        self.run_count = config.num_runs
+        # Jobs of the current generation, and the ones that haven't started yet
+        self.jobs: List[Job] = []
+        self.pending: List[Job] = []
+        self.num_active: int = 0
+        # Final rank values of this generation's members which completed successfully
+        self.values: Dict[int, float] = {}
+        if not ledger.resumed:
+            for n in range(config.num_runs):
+                self.queue(Job(n, self.interval))
+
+    """
+    Returns the steps per generation and the number of generations.
+
+    :param int max_steps: total steps of a member
+    :param int pbt_interval: steps per generation, max_steps / 10 if 0
+    :return: steps per generation
+    :return: number of generations
+    :rtype: Tuple[int, int]
+    """
+
+    @staticmethod
+    def get_generations(max_steps: int, pbt_interval: int) -> Tuple[int, int]:
+        interval: int = pbt_interval if pbt_interval > 0 else max(max_steps // 10, 1)
+        return interval, max(math.ceil(max_steps / interval), 1)
+
+    """
+    Whether there are any pending jobs in the current generation.
+
+    :return: true if there are any pending jobs
+    :rytpe: bool
+    """
+
+    def has_pending(self) -> bool:
+        return len(self.pending) > 0
+
+    """
+    Returns the next job of the current generation.
+
+    :return: next job
+    :rytpe: Job
+    """
+
+    def next_job(self) -> Job:
+        self.num_active += 1
+        return self.pending.pop(0)
+
+    """
+    Adds a job to the current generation and records it in the ledger.
+
+    :param Job job: the job
+    :param int parent: run count of the member the job's run was initialized from
+    :rytpe: None
+    """
+
+    def queue(self, job: Job, parent: int = None) -> None:
+        self.jobs.append(job)
+        self.pending.append(job)
+        self.ledger.record(job.n, 'queued', generation=self.generation, max_steps=job.max_steps,
+                           resume=job.resume, initialize_from=job.initialize_from, parent=parent,
+                           point=self.config.sampler.get_point(job.n))
+
+    """
+    Restores the current generation from the ledger of an interrupted sweep.
+    Queued and interrupted jobs of the current generation are started again.
+
+    :rytpe: None
+    """
+
+    def restore(self) -> None:
+        records: List[Dict[str, Any]] = [r for r in self.ledger.records
+                                         if r['state'] == 'queued' and 'generation' in r]
+        for r in records:
+            self.restore_point(r)
+            self.run_count = max(self.run_count, r['run'] + 1)
+        self.generation = max([r['generation'] for r in records], default=0)
+
+        states: Dict[int, Dict[str, Any]] = self.ledger.get_states()
+        for r in records:
+            if r['generation'] != self.generation:
+                continue
+            job: Job = Job(r['run'], r['max_steps'], r['resume'], None, r.get('initialize_from'))
+            self.jobs.append(job)
+            state: Dict[str, Any] = states[job.n]
+            if state['state'] == 'complete':
+                self.values[job.n] = state.get('value')
+            elif state['state'] == 'started':
+                # Continues from its own checkpoint
+                job.resume = True
+                job.initialize_from = None
+                self.pending.append(job)
+            elif state['state'] == 'queued':
+                self.pending.append(job)
+        log(f'Resuming PBT generation {self.generation}: {len(self.jobs) - len(self.pending)} members done, '
+            f'{len(self.pending)} pending.')
+        if not self.pending:
+            self.exploit()
+
+    """
+    Called when a job's process has exited or was stopped.
+    Starts the next generation once all members of the current one are done.
+
+    :param Job job: the finished job
+    :param int code: process return code, None if stopped
+    :param float value: final rank tag value, None if there is no data
+    :rytpe: None
+    """
+
+    def on_job_done(self, job: Job, code: int, value: float) -> None:
+        self.num_active -= 1
+        if code == 0:
+            self.values[job.n] = value
+        if self.num_active == 0 and not self.pending:
+            self.exploit()
+
+    """
+    Whether a finished run is a member of the current generation that hasn't started yet,
+    or one that will be resumed or used for initializing new members in the next generation.
+
+    :param int n: run count
+    :return: true if the run's checkpoints are still needed
+    :rytpe: bool
+    """
+
+    def may_resume(self, n: int) -> bool:
+        if any(job.n == n for job in self.pending):
+            return True
+        return self.generation < self.num_generations - 1 and any(job.n == n for job in self.jobs)
+
+    """
+    Ranks the members of the current generation, replaces the bottom ones
+    by perturbed copies of top ones and queues the next generation.
+
+    :rytpe: None
+    """
+
+    def exploit(self) -> None:
+        ranked: List[Job] = sorted(self.jobs, key=lambda job: self.get_rank_value(job.n), reverse=True)
+        valid: List[Job] = [job for job in ranked if self.values.get(job.n) is not None]
+        if not valid:
+            log(f'PBT generation {self.generation}: no member completed successfully, stopping.')
+            return
+        best: Job = valid[0]
+        if self.generation == self.num_generations - 1:
+            log(f'PBT complete, best run: {self.args.get_run_id(best.n)}, '
+                f'{self.args.rank_tag}: {self.values[best.n]}.')
+            return
+
+        num_replaced: int = int(len(ranked) * PBTScheduler.quantile) if len(ranked) > 1 else 0
+        top: List[Job] = valid[:max(int(len(valid) * PBTScheduler.quantile), 1)]
+        best_value: float = self.values[best.n]
+        num_new: int = 0
+        self.generation += 1
+        self.jobs = []
+        self.values = {}
+        for rank, job in enumerate(ranked):
+            if job in top or (rank < len(ranked) - num_replaced and job in valid):
+                self.queue(Job(job.n, job.max_steps + self.interval, True, time.time()))
+                continue
+            num_new += 1
+            parent: Job = self.rng.choice(top)
+            n: int = self.run_count
+            self.run_count += 1
+            self.config.sampler.set_point(n, self.perturb(self.config.sampler.get_point(parent.n)))
+            log(f'{self.args.get_run_id(n)} replaces {self.args.get_run_id(job.n)}, '
+                f'initialized from {self.args.get_run_id(parent.n)}.')
+            self.queue(Job(n, self.interval, False, time.time(), self.args.get_run_id(parent.n)), parent.n)
+        log(f'PBT generation {self.generation}: {len(ranked) - num_new} members continue, {num_new} replaced, '
+            f'best run so far: {self.args.get_run_id(best.n)}, {self.args.rank_tag}: {best_value}.')
+
+    """
+    Returns the value used for ranking a member, stopped and failed members rank last.
+
+    :param int n: run count
+    :return: rank value
+    :rytpe: float
+    """
+
+    def get_rank_value(self, n: int) -> float:
+        value: float = self.values.get(n)
+        return -math.inf if value is None else value
+
+    """
+    Perturbs a sample point. Each coordinate is either resampled,
+    or moved by perturb_step (continuous) or one value (discrete).
+
+    :param List[float] point: coordinates in [0, 1)
+    :return: perturbed coordinates in [0, 1)
+    :rtype: List[float]
+    """
+
+    def perturb(self, point: List[float]) -> List[float]:
+        result: List[float] = []
+        for u, size in zip(point, self.axis_sizes):
+            if self.rng.random() < PBTScheduler.resample_prob:
+                u = self.rng.random()
+            else:
+                step: float = 1 / size if size else PBTScheduler.perturb_step
+                u += self.rng.choice((-step, step))
+            result.append(min(max(u, 0), 0.999999))
+        return result
+
+
+"""
+Handles training runs.
+"""
+
+
+class Runner():
+    """
+    :param ArgParser args: ArgParser instance
+    """
+
+    def __init__(self, args: ArgParser):
+        self.args: ArgParser = args
+        # Records run states, for resuming an interrupted sweep
+        self.ledger: Ledger = Ledger(args)
+        self.config: Config = Config(args, self.ledger.resumed)
+        # Each slot can store a subprocess
+        num_slots: int = args.num_envs
+        self.slots: List[subprocess.Popen] = [None] * num_slots
+        # Short run IDs don't contain behavior names, these
+        # are the IDs passed as arguments to the subprocesses
+        self.short_run_ids: List[str] = [None] * num_slots
+        # Need to store verbose run IDs for the subprocesses too,
+        # in order to evaluate stop conditions for each behavior
+        self.verbose_run_ids: List[List[str]] = [None] * num_slots
+        # Jobs that are running in the slots
+        self.jobs: List[Job] = [None] * num_slots
+        # Config hashes of the jobs
+        self.hashes: List[str] = [None] * num_slots
+        # Latest steps of resumed jobs when they were started
+        self.start_steps: List[int] = [0] * num_slots
+        # Threads stopping processes by slot index. Slots stay occupied until their
+        # process has exited, so the next run can't collide with its port or CPUs.
+        self.stopping: Dict[int, threading.Thread] = {}
+        # Skips runs whose config was trained before
+        self.cache: ResultCache = None
+        if args.run_cache != 'off' and not args.serve:
+            # Results of distributed sweeps are stored by the workers
+            self.cache = ResultCache(args.run_cache, args.results_dir)
+        # Launches and stops trainer subprocesses, or publishes
+        # them to a job queue for workers on other machines
+        if args.serve:
+            self.backend: Any = RemoteBackend(args, self.config)
+        elif args.backend == 'terminal':
+            self.backend: Any = TerminalBackend()
+        else:
+            self.backend: Any = HeadlessBackend(args)
+        # Provides scalar values for evaluating stop conditions
+        if args.serve:
+            # Reported by the workers
+            self.metrics: Any = self.backend.metrics
+        elif args.metric_source == 'events':
+            self.metrics: Any = EventFileSource(args.results_dir)
+        else:
+            self.metrics: Any = TensorBoardSource(args.check_workers)
+        # Decides which runs to start
+        if args.scheduler == 'hyperband':
+            self.scheduler: Any = HyperbandScheduler(self.config, args, self.ledger)
+        elif args.scheduler == 'tpe':
+            self.scheduler: Any = TPEScheduler(self.config, args, self.ledger)
+        elif args.scheduler == 'pbt':
+            self.scheduler: Any = PBTScheduler(self.config, args, self.ledger)
+        else:
+            self.scheduler: Any = GridScheduler(self.config, args, self.ledger)
+        if self.ledger.resumed:
+            self.scheduler.restore()
+        # Bounded pool for concurrent metric queries
+        self.pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=args.check_workers)
+        # Latest step by (verbose run id, tag), series that haven't
+        # changed since the last check don't need to be evaluated again
+        self.last_steps: Dict[Tuple[str, str], int] = {}
+        # CPU sets and admission control
+        self.resources: Resources = Resources(args)
+        # Timings of runs, slots and stop checks
+        self.stats: RunStats = RunStats(args, num_slots, self.ledger.resumed)
+        # Number of active slots, tuned at runtime if enabled.
+        # Workers of a distributed sweep have fixed slot counts.
+        self.concurrency: Concurrency = None
+        if args.adaptive_slots and not args.serve:
+            self.concurrency = Concurrency(args, self.config.name)
+        # Deletes checkpoints of stopped and inferior runs, compresses logs.
+        # Results of distributed sweeps are stored by the workers.
+        self.retention: Retention = None
+        if (args.keep_top > 0 or args.compress_logs) and not args.serve:
+            self.retention = Retention(args, self.ledger)
+        # No more runs are started once a run can't finish before the deadline
+        self.deadline: float = self.stats.start_time + args.time_budget if args.time_budget > 0 else None
+        self.out_of_time: bool = False
+        # Exit events posted by process watcher threads: (slot index, process)
+        self.exits: queue.Queue = queue.Queue()
+        self.run_controller()
+
+    """
+    Starts training runs and checks for stop conditions.
+    Free slots are refilled as soon as a subprocess exits,
+    stop conditions are checked on their own interval.
+
+    :rytpe: None
+    """
+
+    def run_controller(self) -> None:
+        interrupt: bool = False
+        interval: int = self.args.check_interval
+        next_check: float = time.time() + interval
+
+        try:
+            self.fill_slots()
+            while self.has_active_runs() or self.has_pending_runs():
+                # Wait for the next exit event, but no longer than the next
+                # progress check. Waiting in short increments keeps the loop
+                # responsive to KeyboardInterrupt on Windows.
+                timeout: float = min(max(next_check - time.time(), 0), 1)
+                try:
+                    i, process = self.exits.get(timeout=timeout)
+                    self.on_process_exit(i, process)
+                except queue.Empty:
+                    pass
+
+                if time.time() >= next_check:
+                    self.check_progress()
+                    next_check = time.time() + interval
+
+                self.fill_slots()
+
+        except KeyboardInterrupt:
+            interrupt = True
+            # Interrupted runs remain 'started' in the ledger,
+            # they will be resumed when the sweep is restarted
+            threads: List[threading.Thread] = []
+            # Runs stopped by a stop condition before the interrupt are finished
+            stopped: List[int] = list(self.stopping)
+            for i, slot in enumerate(self.slots):
+                if slot:
+                    threads.append(self.stopping[i] if i in self.stopping else self.stop_process(i))
+            log('Waiting for active runs to stop...')
+            for thread in threads:
+                if thread:
+                    thread.join()
+            for i in stopped:
+                self.stats.on_finish(i, 'stopped', self.get_trained_steps(i))
+
+        self.pool.shutdown()
+        if self.retention:
+            self.retention.close()
+        self.config.remove_temp_dir()
+        if self.args.serve:
+            self.backend.close()
+        if interrupt:
+            log('Training was interrupted.')
+        elif self.out_of_time:
+            log('Time budget exhausted, call the script again with the same arguments to continue the sweep.')
+        else:
+            log('All training runs complete.')
+        self.stats.log_summary()
+        if self.concurrency and self.concurrency.get_knee():
+            log(f'Adaptive concurrency: best level {self.concurrency.get_knee()} slots, '
+                f'saved to {self.concurrency.path}.')
+
+    """
+    Starts pending runs in all free slots, as long as resources allow.
+
+    :rytpe: None
+    """
+
+    def fill_slots(self) -> None:
+        while self.has_pending_runs():
+            i: int = self.get_free_slot()
+            if i > -1 and self.resources.can_admit(self.has_active_runs()):
+                self.start_process(i)
+            else:
+                break
+
+    """
+    Checks stop conditions for all active runs.
+    Scalars for each (run, tag) are fetched once per check, even if
+    several stop conditions share the same tag.
+
+    :rytpe: None
+    """
+
+    def check_progress(self) -> None:
+        active: List[int] = [i for i, slot in enumerate(self.slots)
+                             if slot and i not in self.stopping and slot.poll() is None]
+        if not active or not (self.config.stop_conditions or self.concurrency):
+            return
+        check_start: float = time.time()
+
+        keys: List[Tuple[str, str]] = []
+        for i in active:
+            for id in self.verbose_run_ids[i]:
+                for cond in self.config.stop_conditions:
+                    if (id, cond.tag) not in keys:
+                        keys.append((id, cond.tag))
+                if self.concurrency and (id, self.args.rank_tag) not in keys:
+                    keys.append((id, self.args.rank_tag))
+        scalars: Dict[Tuple[str, str], List[Tuple[int, float]]] = self.fetch_scalars(keys)
+
+        if self.concurrency:
+            steps: Dict[int, int] = {}
+            for i in active:
+                known: List[int] = [self.last_steps[(id, self.args.rank_tag)] for id in self.verbose_run_ids[i]
+                                    if (id, self.args.rank_tag) in self.last_steps]
+                if known:
+                    steps[self.jobs[i].n] = max(known)
+            self.concurrency.update(steps)
+
+        for i in active:
+            log(f'Checking {self.short_run_ids[i]} progress...')
+            stop, reason = self.must_stop(i, scalars)
+            if stop:
+                log(f'Stopping {self.short_run_ids[i]} because {reason}')
+                self.finish_job(i, None, reason, self.stop_process(i))
+        self.stats.on_check(time.time() - check_start)
+
+    """
+    Queries scalar values concurrently.
+    Omits series without new data since the previous query.
+
+    :param List[Tuple[str, str]] keys: (verbose run id, tag) tuples
+    :return: (step, value) tuples by (verbose run id, tag)
+    :rytpe: Dict[Tuple[str, str], List[Tuple[int, float]]]
+    """
+
+    def fetch_scalars(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Tuple[int, float]]]:
+        futures: Dict[Tuple[str, str], Future] = {}
+        for key in keys:
+            futures[key] = self.pool.submit(self.metrics.get_scalars, key[0], key[1])
+
+        result: Dict[Tuple[str, str], List[Tuple[int, float]]] = {}
+        for key, future in futures.items():
+            data: List[Tuple[int, float]] = future.result()
+            if data and self.last_steps.get(key) != data[-1][0]:
+                self.last_steps[key] = data[-1][0]
+                result[key] = data
+        return result
+
+    """
+    Frees the slot of a subprocess that has exited. The job of a stopped
+    subprocess was finished when it was stopped.
+
+    :param int i: process slot index
+    :param subprocess.Popen process: the exited subprocess
+    :rytpe: None
+    """
+
+    def on_process_exit(self, i: int, process: subprocess.Popen) -> None:
+        if self.slots[i] is not process:
+            return
+        if i in self.stopping:
+            thread: threading.Thread = self.stopping.pop(i)
+            if thread:
+                # Returns as soon as the rest of the process group is killed
+                thread.join()
+            self.slots[i] = None
+            self.stats.on_finish(i, 'stopped', self.get_trained_steps(i))
+            return
+        id: str = self.short_run_ids[i]
+        code: int = process.returncode
+        if code == 0:
+            log(f'{id} complete.')
+        else:
+            log(f'An error occurred in {id}: {code}.')
+        self.slots[i] = None
+        self.finish_job(i, code)
+
+    """
+    Records the outcome of a finished job and notifies the scheduler.
+
+    :param int i: process slot index
+    :param int code: process return code, None if stopped
+    :param str reason: stop reason if stopped
+    :param threading.Thread stopping: thread waiting for a stopped process group, if any
+    :rytpe: None
+    """
+
+    def finish_job(self, i: int, code: int, reason: str = None, stopping: threading.Thread = None) -> None:
+        job: Job = self.jobs[i]
+        metrics: Dict[str, float] = self.get_final_metrics(job.n)
+        value: float = metrics.get(self.args.rank_tag)
+        state: str = 'stopped' if code is None else ('complete' if code == 0 else 'failed')
+        if code is None:
+            self.ledger.record(job.n, state, reason=reason, max_steps=job.max_steps,
+                               value=value, metrics=metrics)
+        else:
+            self.ledger.record(job.n, state, code=code, max_steps=job.max_steps,
+                               value=value, metrics=metrics)
+            if code == 0 and job.max_steps is None and self.cache:
+                self.cache.add(self.hashes[i], self.short_run_ids[i], value, metrics)
+        if i not in self.stopping:
+            self.stats.on_finish(i, state, self.get_trained_steps(i))
+        for cond in self.config.stop_conditions:
+            for id in self.verbose_run_ids[i]:
+                cond.reset(id)
+        self.config.remove_run_config(job.n)
+        self.scheduler.on_job_done(job, code, value)
+        if self.retention:
+            self.retention.on_finish(job.n, state, metrics.get(self.retention.tag), job.max_steps, self.scheduler,
+                                     stopping)
+
+    """
+    Returns the steps a slot's job has trained since it was started.
+
+    :param int i: process slot index
+    :return: number of steps, None if unknown
+    :rytpe: int
+    """
+
+    def get_trained_steps(self, i: int) -> int:
+        last_step: int = self.get_last_step(self.jobs[i].n)
+        return last_step - self.start_steps[i] if last_step is not None else None
+
+    """
+    Returns the latest values of the rank tag and the stop condition tags,
+    averaged over all behaviors of a run.
+
+    :param int n: run count
+    :return: values by tag
+    :rytpe: Dict[str, float]
+    """
+
+    def get_final_metrics(self, n: int) -> Dict[str, float]:
+        tags: List[str] = [self.args.rank_tag] + [c.tag for c in self.config.stop_conditions]
+        if self.retention and self.retention.tag not in tags:
+            tags.append(self.retention.tag)
+        result: Dict[str, float] = {}
+        for tag in tags:
+            values: List[float] = []
+            for id in self.config.get_verbose_run_ids(n):
+                data: List[Tuple[int, float]] = self.metrics.get_scalars(id, tag)
+                if data:
+                    values.append(data[-1][1])
+            if values:
+                result[tag] = sum(values) / len(values)
+        return result
+
+    """
+    Returns the latest step of the rank tag, the max. over all behaviors of a run.
+
+    :param int n: run count
+    :return: latest step, None if there is no data
+    :rytpe: int
+    """
+
+    def get_last_step(self, n: int) -> int:
+        steps: List[int] = []
+        for id in self.config.get_verbose_run_ids(n):
+            data: List[Tuple[int, float]] = self.metrics.get_scalars(id, self.args.rank_tag)
+            if data:
+                steps.append(data[-1][0])
+        return max(steps, default=None)
+
+    """
+    Waits for a subprocess to exit and posts an exit event.
+    Runs in a separate thread for each subprocess.
+
+    :param int i: process slot index
+    :param subprocess.Popen process: the subprocess to wait for
+    :rytpe: None
+    """
+
+    def watch_process(self, i: int, process: subprocess.Popen) -> None:
+        process.wait()
+        self.exits.put((i, process))
+
+    """
+    Starts a training run / launches a subprocess.
+
+    :param int i: slot index where the process will be stored
+    :rytpe: None
+    """
+
+    def start_process(self, i: int) -> None:
+        launched: float = time.time()
+        job: Job = self.scheduler.next_job()
+        n: int = job.n
+
+        # The run's config is generated and saved only now
+        run_config: Dict[str, Any] = self.config.get_run_config(n, job.max_steps)
+        config_hash: str = self.config.get_config_hash(run_config)
+        if self.start_cached(job, config_hash):
+            return
+        # Steps trained before a resumed run was started, for measuring its throughput
+        start_steps: int = (self.get_last_step(n) or 0) if job.resume else 0
+        if not self.fits_time_budget(job, start_steps):
+            return
+        config_path: str = self.config.save_run_config(n, run_config, job.max_steps, config_hash)
+        # Workers pin their own slots
+        cpus: List[int] = None if self.args.serve else self.resources.cpu_sets[i]
+        args: List[str] = self.args.get_process_args(n, i, config_path, job.resume, cpus, job.initialize_from)
+        self.slots[i] = self.backend.start(args, self.args.get_run_id(n))
+        threading.Thread(target=self.watch_process, args=(i, self.slots[i]), daemon=True).start()
+        self.resources.on_admit()
+
+        run_id: str = self.args.get_run_id(n)
+        self.short_run_ids[i] = run_id
+        self.verbose_run_ids[i] = self.config.get_verbose_run_ids(n)
+        self.jobs[i] = job
+        self.hashes[i] = config_hash
+        self.start_steps[i] = start_steps
+        self.stats.on_start(i, n, run_id, job.queued, launched)
+        if self.retention:
+            self.retention.on_start(n)
+        info: Dict[str, Any] = {'max_steps': job.max_steps, 'resume': job.resume, 'hash': config_hash}
+        if self.config.sampler:
+            info['point'] = self.config.sampler.get_point(n)
+        self.ledger.record(n, 'started', **info)
+        if job.max_steps is None:
+            log(f'{run_id} {"resumed" if job.resume else "started"}.')
+        else:
+            log(f'{run_id} {"resumed" if job.resume else "started"}, max_steps: {job.max_steps}.')
+
+    """
+    Whether a job can finish before the deadline, estimated from its remaining
+    steps and the measured steps/sec per slot. Once a job can't, no more
+    jobs are started. The job isn't recorded in the ledger, so it is started
+    if the sweep is resumed later.
+
+    :param Job job: the job to start
+    :param int start_steps: steps trained before the job, if it is resumed
+    :return: true if the job fits, or if there is no time budget or throughput data
+    :rytpe: bool
+    """
+
+    def fits_time_budget(self, job: Job, start_steps: int) -> bool:
+        if self.deadline is None:
+            return True
+        rate: float = self.stats.get_throughput()
+        left: float = self.deadline - time.time()
+        if rate is None and left > 0:
+            return True
+        steps: int = job.max_steps if job.max_steps is not None else self.config.get_run_steps(job.n)
+        needed: float = (steps - start_steps) / rate if rate else math.inf
+        if needed <= left:
+            return True
+        log(f'{self.args.get_run_id(job.n)} would need about {needed / 60:.1f} min, '
+            f'{max(left, 0) / 60:.1f} min of the time budget left. No more runs are started.')
+        self.out_of_time = True
+        return False
+
+    """
+    Reports a job instead of starting it, if an identical run config was
+    trained to completion before. Only applies to full length runs.
+
+    :param Job job: the job to start
+    :param str config_hash: the job's config hash
+    :return: true if the job was found in the cache
+    :rytpe: bool
+    """
+
+    def start_cached(self, job: Job, config_hash: str) -> bool:
+        if not self.cache or job.resume or job.max_steps is not None:
+            return False
+        entry: Dict[str, Any] = self.cache.lookup(config_hash)
+        if entry is None:
+            return False
+
+        run_id: str = self.args.get_run_id(job.n)
+        log(f'{run_id} skipped, identical to {entry["run_id"]} ({entry["path"]}), '
+            f'{self.args.rank_tag}: {entry["value"]}.')
+        self.config.manifest.add(job.n, {'run_id': run_id, 'hash': config_hash, 'cached_from': entry['path'],
+                                         'overrides': self.config.get_run_overrides(job.n)})
+        info: Dict[str, Any] = {'hash': config_hash, 'cached_from': entry['path'], 'value': entry['value'],
+                                'metrics': entry['metrics']}
+        if self.config.sampler:
+            info['point'] = self.config.sampler.get_point(job.n)
+        self.ledger.record(job.n, 'cached', **info)
+        self.scheduler.on_job_done(job, 0, entry['value'])
+        return True
+
+    """
+    Stops specified process. Its slot is freed when the process has exited.
+
+    :param int i: process slot index
+    :return: thread waiting for the process to exit, if any
+    :rytpe: threading.Thread
+    """
+
+    def stop_process(self, i: int) -> threading.Thread:
+        thread: threading.Thread = self.backend.stop(self.slots[i])
+        self.stopping[i] = thread
+        return thread
+
+    """
+    Whether any stop condition was met for a specified process.
+
+    :param int i: process slot index
+    :param Dict[Tuple[str, str], List[Tuple[int, float]]] scalars: fetched scalars
+    :return: true if process must stop.
+    :return: message if process must stop.
+    :rytpe: bool
+    """
+
+    def must_stop(self, i: int, scalars: Dict[Tuple[str, str], List[Tuple[int, float]]]) -> Union[bool, str]:
+        for cond in self.config.stop_conditions:
+            for id in self.verbose_run_ids[i]:
+                if (id, cond.tag) not in scalars:
+                    continue  # No new data
+                stop, reason = cond.evaluate(scalars[(id, cond.tag)], id)
+                if stop:
+                    return True, reason
+        return False, None
+
+    """
+    Whether there are any pending runs.
+
+    :return: true if there are any pending runs
+    :rytpe: bool
+    """
+
+    def has_pending_runs(self) -> bool:
+        return not self.out_of_time and self.scheduler.has_pending()
+
+    """
+    Whether there are any active runs.
+
+    :return: true if there are any active runs
+    :rytpe: bool
+    """
+
+    def has_active_runs(self) -> bool:
+        for slot in self.slots:
+            if slot is not None:
+                return True
+        return False
+
+    """
+    Returns next available process slot index or -1.
+
+    :return: next available process slot index or -1
+    :rytpe: int
+    """
+
+    def get_free_slot(self) -> int:
+        if self.concurrency and sum(1 for slot in self.slots if slot) >= self.concurrency.limit:
+            return -1
+        for i, slot in enumerate(self.slots):
+            if slot is None:
+                return i
+        return -1
+
+
+"""
+Runs jobs of a distributed sweep. Claims jobs from the controller,
+launches headless trainers on the local machine, and reports their
+status and scalar values back to the controller.
+"""
+
+
+class Worker():
+    # Seconds between job requests and status reports
+    poll_interval = 5
+    # Number of consecutive failed requests before giving up on the controller
+    max_retries = 12
+
+    """
+    :param ArgParser args: ArgParser instance
+    """
+
+    def __init__(self, args: ArgParser):
+        self.args: ArgParser = args
+        self.server: xmlrpc.client.ServerProxy = xmlrpc.client.ServerProxy(f'http://{args.worker}',
+                                                                           allow_none=True)
+        num_slots: int = args.num_envs
+        self.slots: List[subprocess.Popen] = [None] * num_slots
+        # Jobs that are running in the slots
+        self.jobs: List[Dict[str, Any]] = [None] * num_slots
+        # Number of scalar values reported so far by (behavior name, tag)
+        self.reported: List[Dict[Tuple[str, str], int]] = [None] * num_slots
+        # Whether the controller asked to stop the run
+        self.stopping: List[bool] = [False] * num_slots
+        self.backend: HeadlessBackend = HeadlessBackend(args)
+        self.resources: Resources = Resources(args)
+        # Created for the results directory of the first job
+        self.metrics: EventFileSource = None
+        # Run configs received from the controller
+        self.config_dir: str = tempfile.mkdtemp(prefix='mlagents-worker-')
+
+        try:
+            info: Dict[str, int] = None
+            while info is None:
+                info = self.call('register', platform.node(), num_slots)
+                if info is None:
+                    time.sleep(Worker.poll_interval)
+            self.worker_id: int = info['worker_id']
+            self.base_port: int = info['base_port']
+            log(f'Registered as worker {self.worker_id}, ports {self.base_port}-{self.base_port + num_slots - 1}.')
+            self.run_worker()
+        finally:
+            shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    """
+    Claims jobs for free slots and reports active runs,
+    until the controller has no more jobs.
+
+    :rytpe: None
+    """
+
+    def run_worker(self) -> None:
+        done: bool = False
+        failures: int = 0
+
+        try:
+            while not done or self.has_active_runs():
+                ok: bool = True
+                for i, slot in enumerate(self.slots):
+                    if slot:
+                        ok = self.report(i) and ok
+
+                while not done:
+                    i: int = self.get_free_slot()
+                    if i == -1 or not self.resources.can_admit(self.has_active_runs()):
+                        break
+                    job: Dict[str, Any] = self.call('claim', self.worker_id)
+                    if job is None:
+                        ok = False
+                        break
+                    if 'run_id' not in job:
+                        done = job['done']
+                        break
+                    self.start_process(i, job)
+
+                failures = 0 if ok else failures + 1
+                if failures >= Worker.max_retries:
+                    log('Lost connection to the controller.')
+                    raise KeyboardInterrupt
+                if not done or self.has_active_runs():
+                    time.sleep(Worker.poll_interval)
+
+        except KeyboardInterrupt:
+            threads: List[threading.Thread] = []
+            for slot in self.slots:
+                if slot:
+                    threads.append(self.backend.stop(slot))
+            log('Waiting for active runs to stop...')
+            for thread in threads:
+                thread.join()
+            log('Worker was interrupted.')
+            return
+
+        log('All jobs complete.')
+
+    """
+    Reports new scalar values of an active run, and its return code if it has exited.
+    Stops the run if the controller asks for it.
+
+    :param int i: process slot index
+    :return: false if the controller could not be reached
+    :rytpe: bool
+    """
+
+    def report(self, i: int) -> bool:
+        process: subprocess.Popen = self.slots[i]
+        job: Dict[str, Any] = self.jobs[i]
+        code: int = process.poll()
+
+        scalars: Dict[str, Dict[str, List[List[float]]]] = {}
+        counts: Dict[Tuple[str, str], int] = {}
+        for name in job['behaviors']:
+            for tag in job['tags']:
+                data: List[Tuple[int, float]] = self.metrics.get_scalars(os.path.join(job['run_id'], name), tag)
+                count: int = self.reported[i].get((name, tag), 0)
+                if len(data) > count:
+                    # Steps are sent as floats, XML-RPC integers are limited to 32 bits
+                    scalars.setdefault(name, {})[tag] = [[float(step), value] for step, value in data[count:]]
+                    counts[(name, tag)] = len(data)
+
+        stop: bool = self.call('report', self.worker_id, job['key'], code, scalars)
+        if stop is None:
+            return False
+        self.reported[i].update(counts)
+
+        if code is not None:
+            log(f'{job["run_id"]} exited: {code}.')
+            self.slots[i] = None
+        elif stop and not self.stopping[i]:
+            log(f'Stopping {job["run_id"]}.')
+            self.backend.stop(process)
+            self.stopping[i] = True
+        return True
+
+    """
+    Launches a trainer subprocess for a claimed job.
+
+    :param int i: slot index where the process will be stored
+    :param Dict[str, Any] job: job data
+    :rytpe: None
+    """
+
+    def start_process(self, i: int, job: Dict[str, Any]) -> None:
+        if self.metrics is None:
+            self.metrics = EventFileSource(job['results_dir'])
+        config_path: str = os.path.join(self.config_dir, job['run_id'] + '.yaml')
+        with open(config_path, 'w') as f:
+            f.write(job['config'])
+
+        args: List[str] = [config_path if arg == '{config}' else arg for arg in job['args']]
+        args.append(f'--base-port={self.base_port + i}')
+        cpus: List[int] = self.resources.cpu_sets[i]
+        if cpus:
+            args = ['taskset', '-c', ','.join(map(str, cpus))] + args
+        self.slots[i] = self.backend.start(args, job['run_id'])
+        self.resources.on_admit()
+        self.jobs[i] = job
+        self.reported[i] = {}
+        self.stopping[i] = False
+        log(f'{job["run_id"]} started.')
+
+    """
+    Calls a controller function.
+
+    :param str name: function name
+    :return: the function's return value, None if the controller could not be reached
+    :rytpe: Any
+    """
+
+    def call(self, name: str, *args: Any) -> Any:
+        try:
+            return getattr(self.server, name)(*args)
+        except (OSError, xmlrpc.client.Error) as e:
+            log(f'Could not reach the controller: {e}')
+            return None
+
+    """
+    Whether there are any active runs.
+
+    :return: true if there are any active runs
+    :rytpe: bool
+    """
+
+    def has_active_runs(self) -> bool:
+        return any(slot is not None for slot in self.slots)
+
+    """
+    Returns next available process slot index or -1.
+
+    :return: next available process slot index or -1
+    :rytpe: int
+    """
+
+    def get_free_slot(self) -> int:
+        for i, slot in enumerate(self.slots):
+            if slot is None:
                 return i
         return -1
 
 
+"""
+Dry run: counts a sweep's runs arithmetically, lists the varied axes and
+estimates the total wall time from max_steps, the number of slots and the
+throughput measured in earlier sweeps. Nothing is written or launched,
+sample points and run configs aren't generated.
+"""
+
+
+class Planner():
+    """
+    :param ArgParser args: ArgParser instance
+    """
+
+    def __init__(self, args: ArgParser):
+        self.args: ArgParser = args
+        self.config: Config = Config(args, dry_run=True)
+        num_slots: int = max(args.num_envs, 1)
+
+        for b in self.config.behaviors:
+            log(f'{b.name}: {len(b.axes)} varied axes, {b.num_combos} value combination(s)')
+            for axis in b.axes:
+                options: List[Union[ValueOption, RangeOption]] = [b.value_options[j] for j in axis]
+                names: str = ', '.join('.'.join(o.path) for o in options)
+                if isinstance(options[0], RangeOption):
+                    size: str = f'{options[0].low} - {options[0].high}{" (log)" if options[0].log else ""}'
+                else:
+                    size: str = f'{len(options[0].values)} values'
+                log(f'  {names}: {size}')
+
+        # (number of runs, steps per run) by phase, phases run one after the other
+        phases: List[Tuple[int, int]] = self.get_phases()
+        num_jobs: int = sum(num for num, steps in phases)
+        total_steps: int = sum(num * steps for num, steps in phases)
+        log(f'{self.config.num_runs} runs ({args.scheduler}), {num_jobs} trainer launches, '
+            f'{total_steps:,} steps in total, {num_slots} slot(s).')
+
+        steps_per_sec, source = self.get_throughput()
+        if steps_per_sec is None:
+            log('No throughput data found, pass --steps-per-sec to estimate the wall time.')
+            return
+        # Runs of a phase are spread over the slots in waves of equal length
+        seconds: float = sum(math.ceil(num / num_slots) * steps / steps_per_sec for num, steps in phases)
+        log(f'Throughput: {steps_per_sec:.1f} steps/sec per slot ({source}).')
+        log(f'Estimated wall time: {seconds / 3600:.2f} h ({seconds * num_slots / 3600:.2f} slot-hours), '
+            f'less if stop conditions end runs early.')
+
+    """
+    Returns the number of runs and their steps for each phase of the sweep.
+    Hyperband rungs and PBT generations wait for the previous one to finish,
+    resumed runs only train the additional steps.
+
+    :return: (number of runs, steps per run) tuples
+    :rtype: List[Tuple[int, int]]
+    """
+
+    def get_phases(self) -> List[Tuple[int, int]]:
+        num_runs: int = self.config.num_runs
+        if self.args.scheduler == 'hyperband':
+            eta: int = max(self.args.eta, 2)
+            phases: List[Tuple[int, int]] = []
+            previous: int = 0
+            # Budgets are computed like the scheduler does, from the highest max_steps
+            for budget in HyperbandScheduler.get_budgets(self.config.get_max_steps(), self.args.min_steps, eta):
+                phases.append((num_runs, budget - previous))
+                previous = budget
+                num_runs = HyperbandScheduler.get_num_promoted(num_runs, eta)
+            return phases
+        if self.args.scheduler == 'pbt':
+            interval, num_generations = PBTScheduler.get_generations(self.config.get_max_steps(),
+                                                                     self.args.pbt_interval)
+            return [(num_runs, interval)] * num_generations
+        return [(num_runs, self.get_mean_steps())]
+
+    """
+    Returns the mean steps per run of a grid or sampled sweep, the highest max_steps
+    of all behaviors. If max_steps is a value option, the mean of its values is used,
+    if it's a range, its midpoint.
+
+    :return: steps per run
+    :rtype: int
+    """
+
+    def get_mean_steps(self) -> int:
+        result: List[float] = []
+        for b in self.config.behaviors:
+            steps: float = b.parsed.get('max_steps', Behavior.default_max_steps)
+            option: Union[ValueOption, RangeOption] = b.get_max_steps_option()
+            if isinstance(option, RangeOption):
+                steps = (option.low + option.high) / 2
+            elif option is not None:
+                steps = sum(option.values) / len(option.values)
+            result.append(float(steps))
+        return int(max(result))
+
+    """
+    Returns the steps/sec per slot: --steps-per-sec if set, otherwise the
+    throughput of earlier sweeps in the config directory, preferring sweeps of
+    the same config, or the throughput of the runs of the latest sweep.
+
+    :return: steps/sec per slot, None if there is no data
+    :return: description of the data source
+    :rtype: Tuple[float, str]
+    """
+
+    def get_throughput(self) -> Tuple[float, str]:
+        if self.args.steps_per_sec > 0:
+            return self.args.steps_per_sec, '--steps-per-sec'
+        dir: str = os.path.dirname(self.args.config_path)
+        rate, num, same = RunStats.load_throughput(os.path.join(dir, 'run_stats_history.jsonl'), self.config.name)
+        if rate is not None:
+            return rate, f'{num} earlier sweep(s){" of " + self.config.name if same else ""}'
+        rate, num, same = RunStats.load_throughput(os.path.join(dir, 'run_stats.jsonl'))
+        if rate is not None:
+            return rate, f'{num} run(s) of the latest sweep'
+        return None, None
+
+
+"""
+Aggregates the event files of a sweep into a leaderboard.
+For each run and tag, the final value, the best value and the area under
+the curve (trapezoidal, divided by the step range) are joined with the
+run's parameter values from the manifest and written to a CSV file.
+Event files are read in parallel by a process pool. Per-file offsets and
+partial aggregates are cached, so summarizing a growing sweep again only
+decodes data that was appended in the meantime.
+"""
+
+
+class Summarizer():
+    """
+    :param ArgParser args: ArgParser instance
+    """
+
+    def __init__(self, args: ArgParser):
+        self.args: ArgParser = args
+        dir: str = os.path.dirname(args.config_path)
+        if not os.path.isfile(os.path.join(dir, 'manifest.jsonl')):
+            log(f'No manifest found next to {args.config_path}, start a sweep with this config first.')
+            return
+        self.manifest: Manifest = Manifest(dir)
+        self.cache_path: str = os.path.join(dir, 'summary_cache.json')
+        self.path: str = args.summary_path or os.path.join(dir, 'summary.csv')
+        # Run states (read only, the sweep hash of the ledger isn't checked)
+        self.states: Dict[int, str] = self.load_states(os.path.join(dir, 'ledger.jsonl'))
+
+        records: Dict[int, Dict[str, Any]] = self.manifest.get_all()
+        # Event file directories by verbose run id, cached runs are read from the run they were cached from
+        dirs: Dict[str, str] = {os.path.join(r['run_id'], name):
+                                os.path.join(r.get('cached_from') or os.path.join(args.results_dir, r['run_id']), name)
+                                for r in records.values() for name in self.manifest.base}
+        cache: Dict[str, Any] = self.load_cache()
+        start: float = time.time()
+        with ProcessPoolExecutor(max_workers=args.summary_workers or None) as pool:
+            futures: Dict[str, Future] = {id: pool.submit(summarize_run, dir, cache.get(id))
+                                          for id, dir in dirs.items()}
+            for id, future in futures.items():
+                cache[id] = future.result()
+        self.save_cache(cache)
+        log(f'Read event files of {len(dirs)} runs in {round(time.time() - start, 2)}s.')
+
+        self.save_leaderboard(records, cache)
+        log(f'Saved leaderboard of {len(records)} runs to {self.path}.')
+
+    """
+    Reads the latest state of each run from the ledger.
+
+    :param str path: ledger path
+    :return: states by run count
+    :rtype: Dict[int, str]
+    """
+
+    def load_states(self, path: str) -> Dict[int, str]:
+        states: Dict[int, str] = {}
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record: Dict[str, Any] = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'run' in record:
+                        states[record['run']] = record['state']
+        except OSError:
+            pass
+        return states
+
+    """
+    Builds the leaderboard rows, sorted by the final rank tag value, and writes them to
+    {path}. Writes a Parquet file instead if {path} ends with .parquet (requires pyarrow).
+
+    :param Dict[int, Dict[str, Any]] records: manifest records by run count
+    :param Dict[str, Any] cache: aggregates by verbose run id
+    :rtype: None
+    """
+
+    def save_leaderboard(self, records: Dict[int, Dict[str, Any]], cache: Dict[str, Any]) -> None:
+        names: List[str] = list(self.manifest.base)
+        # Column names are prefixed with the behavior name if there are multiple behaviors
+        prefix = (lambda name: name + '/') if len(names) > 1 else (lambda name: '')
+        tags: List[str] = [self.args.rank_tag] if self.args.summary_tags is None else self.args.summary_tags
+        if not tags:
+            tags = sorted({tag for id in cache for tag in cache[id]['tags']})
+        rows: List[Dict[str, Any]] = []
+        params: List[str] = []
+        for n, record in records.items():
+            row: Dict[str, Any] = {'run_id': record['run_id'], 'state': self.states.get(n, '')}
+            for name in names:
+                for path, value in record.get('overrides', {}).get(name, []):
+                    key: str = prefix(name) + '.'.join(path)
+                    if key not in params:
+                        params.append(key)
+                    row[key] = value
+                aggregates: Dict[str, List[float]] = cache.get(os.path.join(record['run_id'], name), {}).get('tags', {})
+                row[prefix(name) + 'steps'] = max((a[1] for a in aggregates.values()), default=None)
+                for tag in tags:
+                    if tag in aggregates:
+                        first_step, last_step, last_value, best, area = aggregates[tag]
+                        row[prefix(name) + tag + ' final'] = last_value
+                        row[prefix(name) + tag + ' best'] = best
+                        row[prefix(name) + tag + ' auc'] = area / (last_step - first_step) \
+                            if last_step > first_step else last_value
+            rows.append(row)
+
+        rank_columns: List[str] = [prefix(name) + self.args.rank_tag + ' final' for name in names]
+        rows.sort(key=lambda r: -math.inf if any(r.get(c) is None for c in rank_columns)
+                  else sum(r[c] for c in rank_columns) / len(rank_columns), reverse=True)
+        columns: List[str] = ['run_id', 'state'] + params
+        for name in names:
+            columns.append(prefix(name) + 'steps')
+            columns.extend(prefix(name) + tag + ' ' + kind for tag in tags for kind in ('final', 'best', 'auc'))
+
+        if self.path.endswith('.parquet'):
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                log('Writing Parquet files requires pyarrow, writing CSV instead.')
+                self.path = self.path[:-len('.parquet')] + '.csv'
+            else:
+                table = pyarrow.table({c: [r.get(c) for r in rows] for c in columns})
+                pyarrow.parquet.write_table(table, self.path)
+                return
+        try:
+            with open(self.path, 'w', newline='') as f:
+                writer: csv.DictWriter = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+        except OSError:
+            log(f'Could not write to {self.path}.')
+
+    """
+    Loads cached offsets and aggregates.
+
+    :return: cache content by verbose run id
+    :rtype: Dict[str, Any]
+    """
+
+    def load_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path) as f:
+                cache: Dict[str, Any] = json.load(f)
+            if cache.get('results_dir') == self.args.results_dir:
+                return cache['runs']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    """
+    Saves offsets and aggregates.
+
+    :param Dict[str, Any] cache: cache content by verbose run id
+    :rtype: None
+    """
+
+    def save_cache(self, cache: Dict[str, Any]) -> None:
+        try:
+            with open(self.cache_path + '.tmp', 'w') as f:
+                json.dump({'results_dir': self.args.results_dir, 'runs': cache}, f)
+            os.replace(self.cache_path + '.tmp', self.cache_path)
+        except OSError:
+            log(f'Could not write to {self.cache_path}.')
+
+
+"""
+Reads the event files of a run from the cached offsets and updates the run's
+aggregates. Module level function, so it can be called by pool processes.
+
+:param str dir: directory containing the event files of a run's behavior
+:param Dict[str, Any] state: cached offsets by file name and [first step, last step,
+    last value, best value, area] by tag, None if the run hasn't been read before
+:return: updated state
+:rtype: Dict[str, Any]
+"""
+
+
+def summarize_run(dir: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    paths: List[str] = sorted(glob.glob(os.path.join(dir, 'events.out.tfevents.*')))
+    # New run, or event files were deleted, added or rewritten since the last call, e.g. if a
+    # run ID was trained again. Resumed runs add event files too, these are read from the start.
+    if state is None or set(map(os.path.basename, paths)) != set(state['offsets']) \
+            or any(os.path.getsize(p) < state['offsets'][os.path.basename(p)] for p in paths):
+        state = {'offsets': {}, 'tags': {}}
+    for path in paths:
+        reader: EventFileReader = EventFileReader(path)
+        reader.offset = state['offsets'].get(os.path.basename(path), 0)
+        for tag, step, value in reader.read():
+            aggregate: List[float] = state['tags'].get(tag)
+            if aggregate is None:
+                state['tags'][tag] = [step, step, value, value, 0.0]
+            elif step > aggregate[1]:
+                # Steps that were logged again after resuming are skipped
+                aggregate[4] += (step - aggregate[1]) * (value + aggregate[2]) / 2
+                aggregate[1], aggregate[2] = step, value
+                aggregate[3] = max(aggregate[3], value)
+        state['offsets'][os.path.basename(path)] = reader.offset
+    return state
+
+
 def log(msg):
     now: datetime = datetime.now()
     current_time: str = now.strftime("%H:%M:%S")
@@ -725,7 +4921,15 @@ def log(msg):
 
 def main():
     assert platform.system() == 'Windows' or platform.system() == 'Linux', 'Unsupported platform.'
-    runner = Runner(ArgParser())
+    args: ArgParser = ArgParser()
+    if args.worker:
+        worker = Worker(args)
+    elif args.summarize:
+        summarizer = Summarizer(args)
+    elif args.plan:
+        planner = Planner(args)
+    else:
+        runner = Runner(args)
 
 
 if __name__ == "__main__":
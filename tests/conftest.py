@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The benchmark helpers load mlagents-learn.py and write event files like a trainer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from util import load_runner_module  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def mlagents():
+    """The mlagents-learn.py script, loaded as a module."""
+    return load_runner_module()
+
+
+@pytest.fixture
+def make_args(mlagents, monkeypatch):
+    """Returns an ArgParser for the specified command line arguments."""
+    def make(*argv):
+        monkeypatch.setattr(sys, 'argv', ['mlagents-learn.py'] + [str(a) for a in argv])
+        return mlagents.ArgParser()
+    return make
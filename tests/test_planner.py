@@ -0,0 +1,49 @@
+import pytest
+
+CONFIG = """behaviors:
+  Ball:
+    trainer_type: ppo
+    hyperparameters:
+      beta:
+        opt_values: [0.001, 0.002, 0.003]
+    max_steps:
+      opt_values: [9000, 18000]
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / 'cfg.yaml'
+    path.write_text(CONFIG)
+    return path
+
+
+def test_hyperband_plan_matches_scheduler(mlagents, make_args, config_path):
+    args = make_args(config_path, '--scheduler=hyperband', '--steps-per-sec=1000')
+    phases = mlagents.Planner(args).get_phases()
+
+    args = make_args(config_path, '--scheduler=hyperband')
+    config = mlagents.Config(args)
+    scheduler = mlagents.HyperbandScheduler(config, args, mlagents.Ledger(args))
+
+    assert scheduler.budgets == [2000, 6000, 18000]
+    budgets = []
+    for num, steps in phases:
+        budgets.append(steps + (budgets[-1] if budgets else 0))
+    assert budgets == scheduler.budgets
+    assert phases[0][0] == config.num_runs
+
+
+def test_pbt_plan_matches_scheduler(mlagents, make_args, config_path):
+    args = make_args(config_path, '--scheduler=pbt', '--population=4', '--steps-per-sec=1000')
+    phases = mlagents.Planner(args).get_phases()
+
+    args = make_args(config_path, '--scheduler=pbt', '--population=4')
+    scheduler = mlagents.PBTScheduler(mlagents.Config(args), args, mlagents.Ledger(args))
+
+    assert phases == [(4, scheduler.interval)] * scheduler.num_generations
+
+
+def test_grid_plan_uses_mean_steps(mlagents, make_args, config_path):
+    args = make_args(config_path, '--steps-per-sec=1000')
+    assert mlagents.Planner(args).get_phases() == [(6, 13500)]
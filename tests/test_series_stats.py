@@ -0,0 +1,25 @@
+import random
+
+import pytest
+
+
+def test_window_matches_naive_computation(mlagents):
+    rng = random.Random(0)
+    stats = mlagents.SeriesStats(None, 5)
+    data = [(step * 100, rng.uniform(0, 10)) for step in range(1, 50)]
+    stats.update(data, 0)
+
+    window = data[-5:]
+    xs = [x for x, _ in window]
+    ys = [y for _, y in window]
+    mean_x, mean_y = sum(xs) / 5, sum(ys) / 5
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in window) / sum((x - mean_x) ** 2 for x in xs)
+    assert len(stats.points) == 5
+    assert stats.get_value() == pytest.approx(mean_y)
+    assert stats.get_slope() == pytest.approx(slope)
+
+
+def test_slope_needs_full_window(mlagents):
+    stats = mlagents.SeriesStats(None, 5)
+    stats.update([(100, 1.0), (200, 2.0)], 0)
+    assert stats.get_slope() is None
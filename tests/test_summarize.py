@@ -0,0 +1,58 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+from fake_trainer import encode_event, encode_record
+
+TAG = 'Environment/Cumulative Reward'
+
+
+def write_events(dir, name, rewards):
+    os.makedirs(dir, exist_ok=True)
+    with open(os.path.join(dir, 'events.out.tfevents.' + name), 'ab') as f:
+        for step, reward in rewards:
+            f.write(encode_record(encode_event(step, TAG, reward)))
+
+
+def summarize(mlagents, make_args, config_path, results_dir):
+    args = make_args(config_path, 'summarize', f'--results-dir={results_dir}', '--summary-workers=1')
+    mlagents.Summarizer(args)
+    with open(config_path.parent / 'summary.csv') as f:
+        return {row['run_id']: row for row in csv.DictReader(f)}
+
+
+def test_retrained_run_id_is_read_again(mlagents, make_args, tmp_path):
+    config_path = tmp_path / 'cfg.yaml'
+    config_path.write_text('behaviors:\n  Ball:\n    hyperparameters:\n      batch_size:\n'
+                           '        opt_values: [64, 128]\n')
+    results_dir = tmp_path / 'results'
+    run_dir = results_dir / 'run-0' / 'Ball'
+    base = {'Ball': {'hyperparameters': {'batch_size': {}}}}
+
+    manifest = mlagents.Manifest(str(tmp_path), base)
+    manifest.add(0, {'run_id': 'run-0', 'overrides': {'Ball': [[['hyperparameters', 'batch_size'], 64]]}})
+    write_events(run_dir, '1.host.1', [(100, 10.0), (200, 82.4)])
+    rows = summarize(mlagents, make_args, config_path, results_dir)
+    assert float(rows['run-0'][TAG + ' final']) == pytest.approx(82.4)
+
+    # The run ID is trained again with different params, its new event file has another name
+    shutil.rmtree(results_dir / 'run-0')
+    manifest = mlagents.Manifest(str(tmp_path), base)
+    manifest.add(0, {'run_id': 'run-0', 'overrides': {'Ball': [[['hyperparameters', 'batch_size'], 128]]}})
+    write_events(run_dir, '2.host.2', [(100, 5.0), (200, 23.0)])
+    rows = summarize(mlagents, make_args, config_path, results_dir)
+    assert rows['run-0']['hyperparameters.batch_size'] == '128'
+    assert float(rows['run-0'][TAG + ' final']) == pytest.approx(23.0)
+    assert float(rows['run-0'][TAG + ' best']) == pytest.approx(23.0)
+
+
+def test_appended_events_are_read_incrementally(mlagents, tmp_path):
+    write_events(tmp_path, '1.host.1', [(100, 1.0), (200, 3.0)])
+    state = mlagents.summarize_run(str(tmp_path), None)
+    write_events(tmp_path, '1.host.1', [(300, 5.0)])
+    state = mlagents.summarize_run(str(tmp_path), state)
+    first_step, last_step, last_value, best, area = state['tags'][TAG]
+    assert (first_step, last_step, last_value, best) == (100, 300, 5.0, 5.0)
+    assert area == 100 * 2.0 + 100 * 4.0